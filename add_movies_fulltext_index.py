@@ -0,0 +1,46 @@
+import pymysql
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connect to database
+connection = pymysql.connect(
+    host=os.getenv('DB_HOST'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database=os.getenv('DB_NAME'),
+    cursorclass=pymysql.cursors.DictCursor
+)
+
+print("Connected to database successfully!")
+
+# Migration: FULLTEXT index used by /movies/search.
+# The column list must match the MATCH(...) clause in app/blueprints/movies.py.
+# Needs InnoDB on MySQL 5.6+ (or MyISAM); without it /movies/search falls back
+# to an in-process index.
+index_fulltext_sql = """
+CREATE FULLTEXT INDEX ft_movies_search ON movies (title, plot, actors, director)
+"""
+
+try:
+    with connection.cursor() as cursor:
+        print("\nCreating FULLTEXT index on title, plot, actors, director...")
+        try:
+            cursor.execute(index_fulltext_sql)
+            print("[SUCCESS] FULLTEXT index created!")
+        except pymysql.err.OperationalError as e:
+            if "Duplicate key name" in str(e):
+                print("[INFO] FULLTEXT index already exists, skipping...")
+            else:
+                raise
+
+    connection.commit()
+    print("\n[SUCCESS] All schema updates completed successfully!")
+
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+    connection.rollback()
+finally:
+    connection.close()
+    print("\nDatabase connection closed.")
@@ -1,6 +1,6 @@
-from flask import Flask, g
+from flask import Flask, g, request
 from .app_factory import create_app
-from .db_connect import close_db, get_db
+from .db_connect import close_db, record_db_usage
 
 app = create_app()
 app.secret_key = 'your-secret'  # Replace with an environment
@@ -20,9 +20,17 @@ from . import routes
 
 @app.before_request
 def before_request():
-    g.db = get_db()
-    if g.db is None:
-        print("Warning: Database connection unavailable. Some features may not work.")
+    # Connections are borrowed lazily by get_db(); just reset the round-trip counter
+    g.db_round_trips = 0
+
+@app.after_request
+def add_db_round_trips_header(response):
+    response.headers['X-DB-Round-Trips'] = str(g.get('db_round_trips', 0))
+    return response
+
+@app.teardown_request
+def record_request_db_usage(exception=None):
+    record_db_usage(request.endpoint)
 
 # Setup database connection teardown
 @app.teardown_appcontext
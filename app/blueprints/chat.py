@@ -1,38 +1,270 @@
-from flask import Blueprint, render_template, request, jsonify
-from groq import Groq
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
+from flask import session, current_app, redirect, url_for
+from groq import Groq, RateLimitError, APITimeoutError
+from app.http_client import get_httpx_client, upstream_call, set_host_concurrency
+from app.functions import latency_summary, make_cache, cache_get, cache_set, cache_stats
+from app.functions import shared_store_get, shared_store_set, shared_store_delete
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import json
 import os
+import re
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 
 chat_bp = Blueprint('chat', __name__)
 
-def get_groq_response(question):
+GROQ_UPSTREAM = 'api.groq.com'
+
+# Model routing: short questions without conversation context go to the small,
+# fast model; everything else to the large one. A call that hits 429 or runs
+# past CHAT_LATENCY_BUDGET seconds is retried once on the small model (the SDK's
+# own retries are off for that first attempt, so the fallback is immediate),
+# and the large model is skipped while its p95 latency over the last
+# CHAT_ROUTE_SAMPLE_MAX_AGE seconds is over the budget. Older samples age out,
+# so the large model is tried again once it has been skipped for that long.
+# Latency is time to the answer, or to the first token for streamed answers;
+# timed-out calls count as samples over the budget.
+# Run list_models.py to see which model ids the API key can use.
+CHAT_MODEL_LARGE = os.getenv('CHAT_MODEL_LARGE', "llama-3.3-70b-versatile")
+CHAT_MODEL_SMALL = os.getenv('CHAT_MODEL_SMALL', "llama-3.1-8b-instant")
+CHAT_MODEL = CHAT_MODEL_LARGE  # Default model when none is routed
+CHAT_SHORT_QUESTION_TOKENS = int(os.getenv('CHAT_SHORT_QUESTION_TOKENS', '25'))
+CHAT_LATENCY_BUDGET = float(os.getenv('CHAT_LATENCY_BUDGET', '8'))
+CHAT_ROUTE_MIN_SAMPLES = int(os.getenv('CHAT_ROUTE_MIN_SAMPLES', '20'))
+CHAT_ROUTE_SAMPLE_MAX_AGE = float(os.getenv('CHAT_ROUTE_SAMPLE_MAX_AGE', '300'))
+CHAT_REQUEST_TIMEOUT = 30.0
+CHAT_MODELS_TTL = 3600.0
+CHAT_MODELS_FAILURE_TTL = 60.0   # a failed model list is not retried for this long
+CHAT_MODELS_TIMEOUT = 3.0
+
+# Per-model call counts, recent latencies (seconds) and timestamped routing
+# samples, plus the cached model list
+_model_lock = threading.Lock()
+_model_stats = {}
+_available_models = make_cache(max_entries=1, ttl=CHAT_MODELS_TTL)
+
+# One Groq client per process, reusing the shared pooled httpx client
+_groq_lock = threading.Lock()
+_groq = {'client': None, 'api_key': None}
+
+# Conversations: the last CHAT_HISTORY_MAX_MESSAGES messages per session are
+# kept server-side (SQLite file at CHAT_SESSION_PATH, default in the Flask
+# instance folder). Messages pushed out of that ring buffer are folded into a
+# short running summary, and prompts only carry as much recent history as
+# fits in CHAT_HISTORY_TOKEN_BUDGET (estimated at ~4 characters per token).
+CHAT_SESSION_PATH = os.getenv('CHAT_SESSION_PATH')
+CHAT_SESSION_TTL = float(os.getenv('CHAT_SESSION_TTL', '86400'))
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv('CHAT_HISTORY_MAX_MESSAGES', '20'))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '2000'))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv('CHAT_SUMMARY_MAX_CHARS', '600'))
+
+# Global cap on in-flight Groq calls per worker process. Requests beyond it
+# queue for up to CHAT_QUEUE_TIMEOUT seconds before being turned away.
+CHAT_MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', '32'))
+CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', '15'))
+_chat_slots = threading.BoundedSemaphore(CHAT_MAX_CONCURRENCY)
+
+# Chat slots already bound Groq calls, so the per-host cap and the httpx pool
+# must allow all of them (plus the occasional model list call)
+set_host_concurrency(GROQ_UPSTREAM, CHAT_MAX_CONCURRENCY + 1)
+_queue_lock = threading.Lock()
+_queue_stats = {'active': 0, 'waiting': 0, 'max_waiting': 0, 'rejected': 0}
+
+BUSY_MESSAGE = "The chatbot is handling too many questions right now. Please try again in a moment."
+
+# Answer cache: exact matches on the normalized question + model, plus an
+# optional similarity layer (character trigram Jaccard, no network) that
+# reuses an answer when a new question scores >= CHAT_SEMANTIC_THRESHOLD.
+# Set CHAT_SEMANTIC_THRESHOLD=0 to only use exact matches.
+CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', '3600'))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', '500'))
+CHAT_SEMANTIC_THRESHOLD = float(os.getenv('CHAT_SEMANTIC_THRESHOLD', '0.9'))
+_answer_cache = make_cache(CHAT_CACHE_MAX_ENTRIES, CHAT_CACHE_TTL)
+_similarity_lock = threading.Lock()
+_similarity_index = OrderedDict()   # (model, normalized question) -> (trigrams, numbers)
+_answer_stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'bypassed': 0}
+
+# Streaming timings (seconds) for the most recent streamed answers
+_stream_lock = threading.Lock()
+_stream_stats = {
+    'streams': 0,
+    'errors': 0,
+    'time_to_first_token': deque(maxlen=500),
+    'total_time': deque(maxlen=500),
+}
+
+
+def get_groq_client():
+    """Return the process-wide Groq client, (re)building it if the API key changed."""
+    api_key = os.environ.get('GROQ_API_KEY')
+    with _groq_lock:
+        if _groq['client'] is None or _groq['api_key'] != api_key:
+            _groq['client'] = Groq(api_key=api_key, http_client=get_httpx_client())
+            _groq['api_key'] = api_key
+        return _groq['client']
+
+
+def _model_entry(model):
+    """Return (creating if needed) the stats for model. Caller holds the lock."""
+    if model not in _model_stats:
+        _model_stats[model] = {
+            'requests': 0,
+            'errors': 0,
+            'rate_limited': 0,
+            'timeouts': 0,
+            'fallbacks': 0,
+            'latency': deque(maxlen=500),
+            'samples': deque(maxlen=500),   # (monotonic time, seconds), timeouts included
+        }
+    return _model_stats[model]
+
+
+def _record_model_call(model, seconds, error=None):
+    """
+    Store the outcome and latency of one call to model. Timeouts are kept as
+    routing samples too, so a model that keeps timing out is routed around.
+    """
+    with _model_lock:
+        stats = _model_entry(model)
+        stats['requests'] += 1
+        if error is None:
+            stats['latency'].append(seconds)
+            stats['samples'].append((time.monotonic(), seconds))
+        else:
+            stats['errors'] += 1
+            if isinstance(error, RateLimitError):
+                stats['rate_limited'] += 1
+            elif isinstance(error, APITimeoutError):
+                stats['timeouts'] += 1
+                stats['samples'].append((time.monotonic(), seconds))
+
+
+def _record_fallback(model):
+    """Count one call that gave up on model and moved to the fallback."""
+    with _model_lock:
+        _model_entry(model)['fallbacks'] += 1
+
+
+def get_available_models():
+    """
+    Return the set of model ids the API key can use (refreshed hourly),
+    or None if the list could not be fetched. A failure is cached for
+    CHAT_MODELS_FAILURE_TTL seconds so questions aren't held up retrying it.
+    """
+    models, state = cache_get(_available_models, 'models')
+    if state == 'fresh':
+        return models or None
+    try:
+        client = get_groq_client().with_options(max_retries=0, timeout=CHAT_MODELS_TIMEOUT)
+        with upstream_call(GROQ_UPSTREAM):
+            models = {model.id for model in client.models.list().data}
+    except Exception as e:
+        print(f"[ERROR] Could not list Groq models: {e}")
+        cache_set(_available_models, 'models', set(), ttl=CHAT_MODELS_FAILURE_TTL)
+        return None
+    cache_set(_available_models, 'models', models)
+    return models
+
+
+def fallback_model(model):
+    """Return the faster model to retry on, or None if model is already the fallback."""
+    return CHAT_MODEL_SMALL if model != CHAT_MODEL_SMALL else None
+
+
+def route_model(question, history=None):
+    """
+    Pick the model for a question: the small model for short questions
+    without conversation context, otherwise the large model unless its
+    p95 latency over the last CHAT_ROUTE_SAMPLE_MAX_AGE seconds is over
+    CHAT_LATENCY_BUDGET.
+    """
+    if not history and estimate_tokens(question) <= CHAT_SHORT_QUESTION_TOKENS:
+        model = CHAT_MODEL_SMALL
+    else:
+        model = CHAT_MODEL_LARGE
+        cutoff = time.monotonic() - CHAT_ROUTE_SAMPLE_MAX_AGE
+        with _model_lock:
+            samples = [seconds for recorded, seconds in _model_stats[model]['samples']
+                       if recorded >= cutoff] if model in _model_stats else []
+        if len(samples) >= CHAT_ROUTE_MIN_SAMPLES and latency_summary(samples)['p95'] > CHAT_LATENCY_BUDGET:
+            model = CHAT_MODEL_SMALL
+
+    available = get_available_models()
+    if available and model not in available:
+        other = CHAT_MODEL_LARGE if model == CHAT_MODEL_SMALL else CHAT_MODEL_SMALL
+        if other in available:
+            model = other
+    return model
+
+
+def get_model_stats():
+    """Return per-model call counts and p50/p95 latency."""
+    with _model_lock:
+        report = {}
+        for model, stats in _model_stats.items():
+            entry = {key: value for key, value in stats.items() if key not in ('latency', 'samples')}
+            entry['latency'] = latency_summary(stats['latency'])
+            report[model] = entry
+    return {
+        'large': CHAT_MODEL_LARGE,
+        'small': CHAT_MODEL_SMALL,
+        'latency_budget': CHAT_LATENCY_BUDGET,
+        'models': report,
+    }
+
+
+def _complete(question, model, history, timeout, retry=True):
+    """
+    Run one non-streaming chat completion on model. Raises on API errors.
+    retry=False turns off the SDK's own retries so a 429 or timeout surfaces
+    at once (the caller falls back to another model instead).
+    """
+    client = get_groq_client() if retry else get_groq_client().with_options(max_retries=0)
+    started = time.perf_counter()
+    try:
+        with upstream_call(GROQ_UPSTREAM):
+            chat_completion = client.chat.completions.create(
+                messages=(history or []) + [
+                    {
+                        "role": "user",
+                        "content": question,
+                    }
+                ],
+                model=model,
+                timeout=timeout
+            )
+    except Exception as e:
+        _record_model_call(model, time.perf_counter() - started, error=e)
+        raise
+    _record_model_call(model, time.perf_counter() - started)
+    return chat_completion.choices[0].message.content
+
+
+def get_groq_response(question, model=CHAT_MODEL, history=None):
     """
     Generate AI response using Groq API
+    history is an optional list of earlier {"role", "content"} messages.
+    If model is rate limited or slower than CHAT_LATENCY_BUDGET, the
+    question is retried once on the fallback model.
     """
     try:
-        # Initialize Groq client
-        api_key = os.environ.get('GROQ_API_KEY')
-        print(f"[DEBUG] API Key present: {bool(api_key)}")
-
-        client = Groq(api_key=api_key)
-        print(f"[DEBUG] Groq client initialized")
-
-        # Create chat completion
-        print(f"[DEBUG] Sending question: {question[:50]}...")
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": question,
-                }
-            ],
-            model="llama-3.3-70b-versatile",  # Current supported model
-            timeout=30.0  # 30 second timeout
-        )
-
-        response = chat_completion.choices[0].message.content
+        print(f"[DEBUG] Sending question to {model}: {question[:50]}...")
+        fallback = fallback_model(model)
+        try:
+            response = _complete(question, model, history,
+                                 CHAT_LATENCY_BUDGET if fallback else CHAT_REQUEST_TIMEOUT, retry=fallback is None)
+        except (RateLimitError, APITimeoutError) as e:
+            if fallback is None:
+                raise
+            print(f"[DEBUG] {model} failed ({type(e).__name__}), falling back to {fallback}")
+            _record_fallback(model)
+            response = _complete(question, fallback, history, CHAT_REQUEST_TIMEOUT)
+
         print(f"[DEBUG] Got response: {response[:100]}...")
         return response
 
@@ -43,16 +275,317 @@ def get_groq_response(question):
         return None
 
 
+@contextmanager
+def chat_slot():
+    """
+    Hold one of the CHAT_MAX_CONCURRENCY Groq call slots for the duration of
+    the block. Yields True once a slot is held, or False if none freed up
+    within CHAT_QUEUE_TIMEOUT (the caller should report the chatbot as busy).
+    """
+    with _queue_lock:
+        _queue_stats['waiting'] += 1
+        _queue_stats['max_waiting'] = max(_queue_stats['max_waiting'], _queue_stats['waiting'])
+
+    acquired = _chat_slots.acquire(timeout=CHAT_QUEUE_TIMEOUT)
+
+    with _queue_lock:
+        _queue_stats['waiting'] -= 1
+        if acquired:
+            _queue_stats['active'] += 1
+        else:
+            _queue_stats['rejected'] += 1
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with _queue_lock:
+                _queue_stats['active'] -= 1
+            _chat_slots.release()
+
+
+def get_queue_stats():
+    """Return in-flight and queued question counts."""
+    with _queue_lock:
+        stats = dict(_queue_stats)
+    stats['max_concurrency'] = CHAT_MAX_CONCURRENCY
+    return stats
+
+
+def _session_store_path():
+    """SQLite file holding chat sessions."""
+    return CHAT_SESSION_PATH or os.path.join(current_app.instance_path, 'chat_sessions.sqlite3')
+
+
+def get_chat_id():
+    """Return this browser's chat session id, assigning one on first use."""
+    if 'chat_id' not in session:
+        session['chat_id'] = uuid.uuid4().hex
+    return session['chat_id']
+
+
+def load_conversation(chat_id):
+    """Return the stored conversation {'summary', 'messages'} for chat_id (empty if new or expired)."""
+    conversation, stored_at = shared_store_get(_session_store_path(), 'chat_sessions', chat_id)
+    if conversation is None or time.time() - stored_at > CHAT_SESSION_TTL:
+        return {'summary': '', 'messages': []}
+    return conversation
+
+
+def save_turn(chat_id, conversation, question, answer):
+    """
+    Append a question/answer pair to the conversation ring buffer, folding
+    messages that fall out of it into the summary, and persist it.
+    """
+    messages = conversation['messages'] + [
+        {'role': 'user', 'content': question},
+        {'role': 'assistant', 'content': answer},
+    ]
+    overflow = messages[:-CHAT_HISTORY_MAX_MESSAGES]
+    summary = summarize_messages(conversation['summary'], overflow)
+    conversation = {'summary': summary, 'messages': messages[-CHAT_HISTORY_MAX_MESSAGES:]}
+    shared_store_set(_session_store_path(), 'chat_sessions', chat_id, conversation)
+    return conversation
+
+
+def summarize_messages(summary, messages):
+    """
+    Fold dropped messages into a compact running summary (the topics the
+    user asked about), keeping only the most recent CHAT_SUMMARY_MAX_CHARS.
+    """
+    topics = [message['content'].strip().split('\n')[0][:120]
+              for message in messages if message['role'] == 'user']
+    if not topics:
+        return summary
+    summary = '; '.join([summary] + topics if summary else topics)
+    return summary[-CHAT_SUMMARY_MAX_CHARS:]
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_history(conversation, question):
+    """
+    Return the prompt messages that precede question: the running summary
+    (as a system message) plus the most recent messages that fit, together
+    with the question, inside CHAT_HISTORY_TOKEN_BUDGET.
+    """
+    budget = CHAT_HISTORY_TOKEN_BUDGET - estimate_tokens(question)
+    history = []
+
+    summary = conversation['summary']
+    if summary:
+        summary_message = {'role': 'system', 'content': f"Earlier in this conversation the user asked about: {summary}"}
+        budget -= estimate_tokens(summary_message['content'])
+
+    for message in reversed(conversation['messages']):
+        cost = estimate_tokens(message['content'])
+        if cost > budget:
+            break
+        history.insert(0, message)
+        budget -= cost
+
+    # Keep turns whole: never start the history with an orphaned answer
+    if history and history[0]['role'] == 'assistant':
+        history = history[1:]
+
+    if summary:
+        history.insert(0, summary_message)
+    return history
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace so trivial variations match."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', question.lower()).split())
+
+
+def _question_features(normalized):
+    """Character trigrams and numbers of a normalized question for similarity matching."""
+    padded = f"  {normalized} "
+    trigrams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    numbers = tuple(re.findall(r'\d+', normalized))
+    return trigrams, numbers
+
+
+def _count_answer(name):
+    """Increment one answer cache counter."""
+    with _similarity_lock:
+        _answer_stats[name] += 1
+
+
+def get_cached_answer(question, model=CHAT_MODEL):
+    """
+    Return (answer, 'exact' | 'semantic') from the answer cache, or (None, None).
+    Similar questions only match when they mention the same numbers.
+    """
+    normalized = normalize_question(question)
+    answer, state = cache_get(_answer_cache, (model, normalized))
+    if state == 'fresh':
+        _count_answer('exact_hits')
+        return answer, 'exact'
+
+    if CHAT_SEMANTIC_THRESHOLD > 0:
+        trigrams, numbers = _question_features(normalized)
+        matches = []
+        with _similarity_lock:
+            for key, (other_trigrams, other_numbers) in _similarity_index.items():
+                if key[0] != model or other_numbers != numbers:
+                    continue
+                score = len(trigrams & other_trigrams) / len(trigrams | other_trigrams)
+                if score >= CHAT_SEMANTIC_THRESHOLD:
+                    matches.append((score, key))
+
+        # Best match first; keys whose answer expired are dropped from the index
+        for score, key in sorted(matches, reverse=True):
+            answer, state = cache_get(_answer_cache, key)
+            if state == 'fresh':
+                _count_answer('semantic_hits')
+                return answer, 'semantic'
+            with _similarity_lock:
+                _similarity_index.pop(key, None)
+
+    _count_answer('misses')
+    return None, None
+
+
+def cache_answer(question, answer, model=CHAT_MODEL):
+    """Store an answer for exact and similarity lookups."""
+    normalized = normalize_question(question)
+    key = (model, normalized)
+    cache_set(_answer_cache, key, answer)
+    with _similarity_lock:
+        _similarity_index[key] = _question_features(normalized)
+        _similarity_index.move_to_end(key)
+        while len(_similarity_index) > CHAT_CACHE_MAX_ENTRIES:
+            _similarity_index.popitem(last=False)
+
+
+def get_answer_cache_stats():
+    """Return exact/semantic hit counts, hit rate and cache size."""
+    with _similarity_lock:
+        stats = dict(_answer_stats)
+    lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['exact_hits'] + stats['semantic_hits']) / lookups, 4) if lookups else 0.0
+    stats['size'] = cache_stats(_answer_cache)['size']
+    stats['semantic_threshold'] = CHAT_SEMANTIC_THRESHOLD
+    return stats
+
+
+def _stream_completion(question, model, history, timeout, retry=True):
+    """
+    Yield text chunks of one streaming chat completion on model. Raises on
+    API errors. retry=False turns off the SDK's own retries, as in _complete.
+    """
+    client = get_groq_client() if retry else get_groq_client().with_options(max_retries=0)
+    started = time.perf_counter()
+    first_token = None
+    try:
+        with upstream_call(GROQ_UPSTREAM):
+            stream = client.chat.completions.create(
+                messages=(history or []) + [
+                    {
+                        "role": "user",
+                        "content": question,
+                    }
+                ],
+                model=model,
+                timeout=timeout,
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        # Routing cares about time to first token, not answer length
+                        first_token = time.perf_counter() - started
+                        _record_model_call(model, first_token)
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        if first_token is None:
+            _record_model_call(model, time.perf_counter() - started, error=e)
+        else:
+            with _model_lock:
+                _model_entry(model)['errors'] += 1
+        raise
+    if first_token is None:
+        _record_model_call(model, time.perf_counter() - started)
+
+
+def stream_groq_response(question, model=CHAT_MODEL, history=None):
+    """
+    Generate an AI response using the Groq API with stream=True, yielding
+    text chunks as they arrive. Raises on API errors. Falls back to the
+    faster model on 429 or a timeout, as long as nothing was sent yet.
+    """
+    print(f"[DEBUG] Streaming question to {model}: {question[:50]}...")
+    fallback = fallback_model(model)
+    sent = False
+    try:
+        for text in _stream_completion(question, model, history,
+                                       CHAT_LATENCY_BUDGET if fallback else CHAT_REQUEST_TIMEOUT, retry=fallback is None):
+            sent = True
+            yield text
+        return
+    except (RateLimitError, APITimeoutError) as e:
+        if fallback is None or sent:
+            raise
+        print(f"[DEBUG] {model} failed ({type(e).__name__}), falling back to {fallback}")
+        _record_fallback(model)
+
+    yield from _stream_completion(question, fallback, history, CHAT_REQUEST_TIMEOUT)
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _record_stream(first_token, total, failed):
+    """Store timings for one streamed answer."""
+    with _stream_lock:
+        _stream_stats['streams'] += 1
+        if failed:
+            _stream_stats['errors'] += 1
+        if first_token is not None:
+            _stream_stats['time_to_first_token'].append(first_token)
+        if not failed:
+            _stream_stats['total_time'].append(total)
+
+
+def get_stream_stats():
+    """Return stream counts plus time-to-first-token and total time summaries."""
+    with _stream_lock:
+        return {
+            'streams': _stream_stats['streams'],
+            'errors': _stream_stats['errors'],
+            'time_to_first_token': latency_summary(_stream_stats['time_to_first_token']),
+            'total_time': latency_summary(_stream_stats['total_time']),
+        }
+
+
 @chat_bp.route('/chatbot', methods=['GET'])
 def index():
-    """Display chat interface"""
-    return render_template("chat.html", response=None)
+    """Display chat interface with the current conversation"""
+    conversation = load_conversation(session['chat_id']) if 'chat_id' in session else None
+    history = conversation['messages'] if conversation else []
+    return render_template("chat.html", response=None, history=history)
+
+
+@chat_bp.route('/chatbot/reset', methods=['POST'])
+def reset():
+    """Start a new conversation"""
+    chat_id = session.pop('chat_id', None)
+    if chat_id:
+        shared_store_delete(_session_store_path(), 'chat_sessions', chat_id)
+    return redirect(url_for('chat.index'))
 
 
 @chat_bp.route('/chatbot/ask', methods=['POST'])
 def ask():
     """Handle chat questions via POST form"""
     question = request.form.get('question', '').strip()
+    bypass_cache = request.form.get('nocache') == '1'
 
     if not question:
         return render_template("chat.html",
@@ -66,18 +599,42 @@ def ask():
                              response=None,
                              error="Groq API key is not configured. Please set GROQ_API_KEY in environment variables.")
 
-    # Get response from Groq
+    # Get response from the answer cache (first question only), or from Groq
     try:
-        response = get_groq_response(question)
+        chat_id = get_chat_id()
+        conversation = load_conversation(chat_id)
+        history = build_history(conversation, question)
+        use_cache = not history
+        model = route_model(question, history)
+
+        response = None
+        if bypass_cache:
+            _count_answer('bypassed')
+        elif use_cache:
+            response, _ = get_cached_answer(question, model)
 
         if response is None:
-            return render_template("chat.html",
-                                 response=None,
-                                 error="Failed to get response from Groq API. The API may be experiencing issues. Please try again in a moment.")
+            with chat_slot() as acquired:
+                if not acquired:
+                    return render_template("chat.html",
+                                         response=None,
+                                         history=conversation['messages'],
+                                         error=BUSY_MESSAGE)
+                response = get_groq_response(question, model=model, history=history)
+
+            if response is None:
+                return render_template("chat.html",
+                                     response=None,
+                                     history=conversation['messages'],
+                                     error="Failed to get response from Groq API. The API may be experiencing issues. Please try again in a moment.")
+            if use_cache:
+                cache_answer(question, response, model)
+
+        conversation = save_turn(chat_id, conversation, question, response)
 
         return render_template("chat.html",
-                             response=response,
-                             question=question)
+                             response=None,
+                             history=conversation['messages'])
     except Exception as e:
         print(f"[ERROR] Exception in ask route: {e}")
         import traceback
@@ -85,3 +642,76 @@ def ask():
         return render_template("chat.html",
                              response=None,
                              error=f"An error occurred: {str(e)}")
+
+
+@chat_bp.route('/chatbot/stream', methods=['GET'])
+def stream():
+    """Stream the answer to ?question= token by token as Server-Sent Events"""
+    question = request.args.get('question', '').strip()
+    bypass_cache = request.args.get('nocache') == '1'
+    chat_id = get_chat_id()
+
+    def events():
+        if not question:
+            yield sse_event('error', {'error': "Question is required"})
+            return
+        if not os.getenv('GROQ_API_KEY'):
+            yield sse_event('error', {'error': "Groq API key is not configured. Please set GROQ_API_KEY in environment variables."})
+            return
+
+        conversation = load_conversation(chat_id)
+        history = build_history(conversation, question)
+        use_cache = not history
+        model = route_model(question, history)
+
+        if bypass_cache:
+            _count_answer('bypassed')
+        elif use_cache:
+            answer, match = get_cached_answer(question, model)
+            if answer is not None:
+                save_turn(chat_id, conversation, question, answer)
+                yield sse_event('token', {'text': answer})
+                yield sse_event('done', {'cached': match, 'time_to_first_token': 0.0, 'total_time': 0.0})
+                return
+
+        with chat_slot() as acquired:
+            if not acquired:
+                yield sse_event('error', {'error': BUSY_MESSAGE})
+                return
+
+            started = time.perf_counter()
+            first_token = None
+            parts = []
+            try:
+                for text in stream_groq_response(question, model=model, history=history):
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    parts.append(text)
+                    yield sse_event('token', {'text': text})
+            except Exception as e:
+                print(f"[ERROR] Groq streaming error: {e}")
+                _record_stream(first_token, time.perf_counter() - started, failed=True)
+                yield sse_event('error', {'error': "Failed to get response from Groq API. Please try again in a moment."})
+                return
+
+        total = time.perf_counter() - started
+        _record_stream(first_token, total, failed=False)
+        if parts:
+            answer = ''.join(parts)
+            save_turn(chat_id, conversation, question, answer)
+            if use_cache:
+                cache_answer(question, answer, model)
+        yield sse_event('done', {'model': model, 'time_to_first_token': first_token, 'total_time': total})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@chat_bp.route('/chatbot/stats', methods=['GET'])
+def stats():
+    """Return queue depth, answer cache, streaming and per-model latency metrics as JSON"""
+    return jsonify(queue=get_queue_stats(), cache=get_answer_cache_stats(), streaming=get_stream_stats(),
+                   routing=get_model_stats())
@@ -1,32 +1,234 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from app.db_connect import get_db
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from app.db_connect import get_db, stream_rows
+from app.http_client import http_get, http_get_at
+from app.functions import datatables_page, make_rate_limiter, acquire_token, rate_limiter_stats
+from app.functions import get_cached_page, store_cached_page, invalidate_table_pages
+from app.functions import shared_store_get, shared_store_set
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import hashlib
+import ipaddress
+import pymysql
 import requests
+import math
 import os
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
+try:
+    from PIL import Image   # optional: without Pillow posters are not cached (the original URL is used)
+except ImportError:
+    Image = None
+
 load_dotenv()
 
 movies_bp = Blueprint('movies', __name__)
 
+# Row schema of the movies list: the only columns the list query selects and
+# movies.html renders. plot and actors (TEXT) are loaded by view_movie only.
+MOVIES_TABLE = {
+    'table': 'movies',
+    'key': 'movie_id',
+    'columns': ['poster', 'title', 'director', 'year', 'genre'],
+    'orderable': ['title', 'year'],          # idx_movies_title, idx_movies_year
+    'nullable': ['year'],
+    'searchable': ['title'],
+    'default_order': 'title',
+}
+
+# OMDB requests are paced by a token bucket (OMDB_RATE per second) and capped
+# at OMDB_DAILY_QUOTA per UTC day per process (free keys allow 1,000 a day).
+# Bulk enrichment fetches OMDB_ENRICH_WORKERS movies at a time and saves every
+# OMDB_ENRICH_BATCH_SIZE results with one executemany UPDATE.
+OMDB_RATE = float(os.getenv('OMDB_RATE', '5'))
+OMDB_DAILY_QUOTA = int(os.getenv('OMDB_DAILY_QUOTA', '1000'))
+OMDB_ENRICH_WORKERS = int(os.getenv('OMDB_ENRICH_WORKERS', '4'))
+OMDB_ENRICH_BATCH_SIZE = int(os.getenv('OMDB_ENRICH_BATCH_SIZE', '50'))
+OMDB_ENRICH_ROUTE_LIMIT = int(os.getenv('OMDB_ENRICH_ROUTE_LIMIT', '100'))
+_omdb_limiter = make_rate_limiter(OMDB_RATE, burst=OMDB_ENRICH_WORKERS)
+_omdb_lock = threading.Lock()
+_omdb_quota = {'day': None, 'used': 0, 'exhausted': False}
+
+# Local caches (OMDB responses, poster thumbnails) live in the Flask instance folder
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'instance')
+
+# Raw OMDB responses are kept in a SQLite file (OMDB_CACHE_PATH, default
+# instance/omdb_cache.sqlite3): titles map to an imdbID, imdbIDs to the full
+# response. "Movie not found" answers are cached for OMDB_NEGATIVE_TTL.
+# OMDB_CACHE_ONLY=1 (or cache_only=True) never calls OMDB, e.g. for re-imports.
+OMDB_CACHE_PATH = os.getenv('OMDB_CACHE_PATH') or os.path.join(INSTANCE_DIR, 'omdb_cache.sqlite3')
+OMDB_CACHE_TTL = float(os.getenv('OMDB_CACHE_TTL', str(90 * 86400)))
+OMDB_NEGATIVE_TTL = float(os.getenv('OMDB_NEGATIVE_TTL', str(7 * 86400)))
+OMDB_CACHE_ONLY = os.getenv('OMDB_CACHE_ONLY') == '1'
+_omdb_cache_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0}
+
+# Poster proxy: each poster URL is downloaded once and resized to the widths in
+# POSTER_SIZES (list thumbnails are shown at 50px, so 2x for high-DPI screens).
+# Files are named by content hash, so they are served as immutable for a year.
+# Only public http(s) URLs answering with an image/* body of at most
+# POSTER_MAX_BYTES are fetched, and only bytes Pillow re-encodes as JPEG are stored.
+POSTER_CACHE_DIR = os.getenv('POSTER_CACHE_DIR') or os.path.join(INSTANCE_DIR, 'posters')
+POSTER_INDEX_PATH = os.path.join(POSTER_CACHE_DIR, 'posters.sqlite3')
+POSTER_SIZES = {'list': 100, 'detail': 600}
+POSTER_MAX_AGE = 365 * 86400
+POSTER_REDIRECT_MAX_AGE = 86400
+POSTER_MAX_BYTES = int(os.getenv('POSTER_MAX_BYTES', str(5 * 1024 * 1024)))
+_poster_lock = threading.Lock()
+_poster_stats = {'hits': 0, 'generated': 0, 'errors': 0, 'rejected': 0}
+
+OMDB_UPDATE_QUERY = """
+UPDATE movies
+SET director = %s, year = %s, plot = %s, poster = %s, actors = %s, genre = %s
+WHERE movie_id = %s
+"""
+
+# Marks a title OMDB does not know as attempted, so bulk enrichment skips it
+OMDB_NOT_FOUND_QUERY = "UPDATE movies SET director = 'N/A' WHERE movie_id = %s"
+
+# Full-text search: MATCH ... AGAINST on the ft_movies_search FULLTEXT index
+# (add_movies_fulltext_index.py). Where that index is missing or unsupported,
+# search falls back to an in-process inverted index over the same columns,
+# rebuilt whenever the movies table changes; FULLTEXT is retried every
+# SEARCH_FULLTEXT_RETRY seconds.
+SEARCH_COLUMNS = ('title', 'plot', 'actors', 'director')
+SEARCH_FIELD_WEIGHTS = {'title': 3.0, 'director': 2.0, 'actors': 1.5, 'plot': 1.0}
+SEARCH_MAX_PER_PAGE = 100
+SEARCH_FULLTEXT_RETRY = float(os.getenv('SEARCH_FULLTEXT_RETRY', '300'))
+FULLTEXT_UNAVAILABLE_ERRORS = (1191, 1214)   # no FULLTEXT index / engine lacks FULLTEXT
+SEARCH_STOPWORDS = frozenset('a an and are as at be by for from in is it of on or that the to was with'.split())
+_search_lock = threading.Lock()
+_search_build_lock = threading.Lock()   # one rebuild at a time; other searches wait and reuse it
+_search_index = {'version': None, 'postings': {}, 'movies': {}, 'fulltext_retry_at': 0.0}
+_search_stats = {'fulltext': 0, 'fallback': 0, 'index_builds': 0}
+
 @movies_bp.route('/movies')
 def index():
-    """Display all movies"""
+    """Display the movies page; rows are loaded a page at a time from /movies/data"""
+    return render_template("movies.html", table=MOVIES_TABLE)
+
+
+@movies_bp.route('/movies/data')
+def data():
+    """Return one page of movies for DataTables (server-side processing), cached until the table changes"""
+    draw = request.args.get('draw', type=int, default=0)
+    key, page = get_cached_page('movies', request.args)
+    if page is not None:
+        return jsonify(dict(page, draw=draw))
+
     connection = get_db()
-    result = []
 
     if connection is None:
-        flash("Database connection failed. Please check your database configuration.", "error")
-    else:
-        try:
-            query = "SELECT * FROM movies ORDER BY title"
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                result = cursor.fetchall()
-        except Exception as e:
-            flash(f"Database error: {e}", "error")
-            result = []
+        return jsonify(error="Database connection failed."), 503
+
+    try:
+        page = datatables_page(connection, MOVIES_TABLE, request.args)
+    except Exception as e:
+        return jsonify(error=f"Database error: {e}"), 500
+
+    store_cached_page('movies', key, page)
+    return jsonify(page)
+
+
+@movies_bp.route('/movies/search')
+def search():
+    """Return ranked, paginated full-text search results for ?q= as JSON"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', type=int, default=1), 1)
+    per_page = min(max(request.args.get('per_page', type=int, default=20), 1), SEARCH_MAX_PER_PAGE)
+
+    if not query:
+        return jsonify(error="Search query is required."), 400
+
+    connection = get_db()
+
+    if connection is None:
+        return jsonify(error="Database connection failed."), 503
+
+    started = time.perf_counter()
+    try:
+        mode = 'fallback'
+        if time.monotonic() >= _search_index['fulltext_retry_at']:
+            try:
+                total, results = fulltext_search(connection, query, page, per_page)
+                mode = 'fulltext'
+            except pymysql.err.MySQLError as e:
+                if not e.args or e.args[0] not in FULLTEXT_UNAVAILABLE_ERRORS:
+                    raise
+                print(f"[INFO] FULLTEXT search unavailable ({e}); using the in-process index")
+                _search_index['fulltext_retry_at'] = time.monotonic() + SEARCH_FULLTEXT_RETRY
+        if mode == 'fallback':
+            total, results = fallback_search(connection, query, page, per_page)
+    except Exception as e:
+        return jsonify(error=f"Database error: {e}"), 500
+
+    with _search_lock:
+        _search_stats[mode] += 1
+
+    return jsonify(
+        query=query,
+        mode=mode,
+        page=page,
+        per_page=per_page,
+        total=total,
+        results=results,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
+
+@movies_bp.route('/movies/stats')
+def stats():
+    """Return search, OMDB quota/cache and poster cache metrics as JSON"""
+    return jsonify(search=get_search_stats(), omdb=get_omdb_stats(), posters=get_poster_stats())
+
+
+@movies_bp.route('/movies/poster/<int:movie_id>')
+def poster(movie_id):
+    """Redirect to the cached poster thumbnail (?size=list|detail) for a movie"""
+    size = request.args.get('size', 'list')
+    if size not in POSTER_SIZES:
+        size = 'list'
+
+    connection = get_db()
+
+    if connection is None:
+        return "Database connection failed.", 503
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT poster FROM movies WHERE movie_id = %s", (movie_id,))
+            movie = cursor.fetchone()
+    except Exception as e:
+        return f"Database error: {e}", 500
 
-    return render_template("movies.html", movies=result)
+    if not movie or not movie['poster'] or urlsplit(movie['poster']).scheme not in ('http', 'https'):
+        return "No poster available.", 404
+
+    files = cache_poster(movie['poster'])
+    if files is None:
+        # Could not cache it; let the browser load the original for now
+        return redirect(movie['poster'])
+
+    response = redirect(url_for('movies.poster_file', filename=files[size]))
+    response.cache_control.public = True
+    response.cache_control.max_age = POSTER_REDIRECT_MAX_AGE
+    return response
+
+
+@movies_bp.route('/movies/posters/<filename>')
+def poster_file(filename):
+    """Serve a content-addressed poster thumbnail with long-lived immutable caching"""
+    if not filename.endswith('.jpg'):
+        return "No poster available.", 404
+    response = send_from_directory(POSTER_CACHE_DIR, filename, mimetype='image/jpeg', max_age=POSTER_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 
 @movies_bp.route('/movies/add', methods=['POST'])
@@ -53,6 +255,7 @@ def add_movie():
         with connection.cursor() as cursor:
             cursor.execute(query, (title, None, None, None, None, None, None))
         connection.commit()
+        invalidate_table_pages('movies')
 
         flash(f"Movie '{title}' added successfully! Click 'Fetch Data' to get movie details from OMDB.", "success")
     except Exception as e:
@@ -61,6 +264,43 @@ def add_movie():
     return redirect(url_for('movies.index'))
 
 
+@movies_bp.route('/movies/fetch/all')
+def fetch_all_data():
+    """Fetch OMDB data for movies that were never enriched, concurrently and in batches"""
+    connection = get_db()
+
+    if connection is None:
+        flash("Database connection failed.", "error")
+        return redirect(url_for('movies.index'))
+
+    if not os.getenv('OMDB_API_KEY'):
+        flash("OMDB API key is not configured. Please set OMDB_API_KEY in environment variables.", "error")
+        return redirect(url_for('movies.index'))
+
+    try:
+        # Keep the request short; enrich_movies.py has no limit
+        report = enrich_all_movies(connection, limit=request.args.get('limit', type=int, default=OMDB_ENRICH_ROUTE_LIMIT))
+
+        summary = (f"Enriched {report['updated']} movie(s) in {report['elapsed']:.2f}s "
+                   f"({report['rate']:.1f} movies/sec).")
+        if not report['updated'] and not report['failed'] and not report['skipped']:
+            flash("No movies are missing data.", "success")
+        elif report['failed'] or report['skipped']:
+            details = []
+            if report['failed']:
+                details.append(f"Not found: {', '.join(report['failed'])}.")
+            if report['skipped']:
+                details.append(f"{report['skipped']} skipped: OMDB daily quota reached.")
+            flash(f"{summary} {' '.join(details)}", "error")
+        else:
+            flash(summary, "success")
+
+    except Exception as e:
+        flash(f"Error fetching movie data: {e}", "error")
+
+    return redirect(url_for('movies.index'))
+
+
 @movies_bp.route('/movies/fetch/<int:movie_id>')
 def fetch_data(movie_id):
     """Fetch data from OMDB API and update"""
@@ -95,22 +335,14 @@ def fetch_data(movie_id):
             return redirect(url_for('movies.index'))
 
         # Update database with fetched data
-        update_query = """
-        UPDATE movies
-        SET director = %s, year = %s, plot = %s, poster = %s, actors = %s, genre = %s
-        WHERE movie_id = %s
-        """
         with connection.cursor() as cursor:
-            cursor.execute(update_query, (
-                movie_data.get('director'),
-                movie_data.get('year'),
-                movie_data.get('plot'),
-                movie_data.get('poster'),
-                movie_data.get('actors'),
-                movie_data.get('genre'),
-                movie_id
-            ))
+            cursor.execute(OMDB_UPDATE_QUERY, _omdb_update_params(movie_data, movie_id))
         connection.commit()
+        invalidate_table_pages('movies')
+
+        # Pre-generate the poster thumbnails so the list never waits on them
+        if movie_data.get('poster'):
+            cache_poster(movie_data['poster'])
 
         flash(f"Movie data fetched and updated for '{title}'!", "success")
 
@@ -179,6 +411,7 @@ def edit_movie(movie_id):
             with connection.cursor() as cursor:
                 cursor.execute(query, (title, director, year, plot, poster, actors, genre, movie_id))
             connection.commit()
+            invalidate_table_pages('movies')
 
             flash(f"Movie '{title}' updated successfully!", "success")
             return redirect(url_for('movies.index'))
@@ -230,6 +463,7 @@ def delete_movie(movie_id):
         with connection.cursor() as cursor:
             cursor.execute(delete_query, (movie_id,))
         connection.commit()
+        invalidate_table_pages('movies')
 
         flash(f"Movie '{title}' deleted successfully!", "success")
 
@@ -239,33 +473,65 @@ def delete_movie(movie_id):
     return redirect(url_for('movies.index'))
 
 
-def fetch_omdb_data(title):
+def fetch_omdb_data(title, cache_only=False):
     """
     Fetch movie data from OMDB API
     Get a free API key at: http://www.omdbapi.com/apikey.aspx
+    Responses come from the persistent OMDB cache when possible; with
+    cache_only (or OMDB_CACHE_ONLY) a cache miss returns None without a request.
     """
-    api_key = os.getenv('OMDB_API_KEY')
+    data = get_cached_omdb(title)
 
-    if not api_key:
-        print("Warning: OMDB_API_KEY not set in environment variables")
-        return None
+    if data is None:
+        if cache_only or OMDB_CACHE_ONLY:
+            return None
 
-    try:
-        url = "http://www.omdbapi.com/"
-        params = {
-            'apikey': api_key,
-            't': title,  # Search by title
-            'type': 'movie',
-            'plot': 'full'  # Get full plot
-        }
+        api_key = os.getenv('OMDB_API_KEY')
 
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        if not api_key:
+            print("Warning: OMDB_API_KEY not set in environment variables")
+            return None
+
+        if not _take_omdb_quota():
+            print(f"[ERROR] OMDB daily quota reached, not fetching: {title}")
+            return None
+        acquire_token(_omdb_limiter)
 
+        try:
+            url = "http://www.omdbapi.com/"
+            params = {
+                'apikey': api_key,
+                't': title,  # Search by title
+                'type': 'movie',
+                'plot': 'full'  # Get full plot
+            }
+
+            response = http_get(url, params=params, timeout=10)
+            if response.status_code == 401 and _omdb_limit_reached(response):
+                # "Request limit reached!" comes back as a 401; stop calling OMDB today
+                with _omdb_lock:
+                    _omdb_quota['exhausted'] = True
+                print(f"[ERROR] OMDB request limit reached, not fetching: {title}")
+                return None
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"[ERROR] API request failed: {e}")
+            return None
+        except ValueError as e:
+            print(f"[ERROR] Error parsing API response: {e}")
+            return None
+
+        store_omdb_response(title, data)
+
+    try:
         # Check if movie was found
         if data.get('Response') == 'False':
-            print(f"[ERROR] Movie not found: {data.get('Error', 'Unknown error')}")
+            error = data.get('Error', 'Unknown error')
+            if 'limit' in error.lower():
+                with _omdb_lock:
+                    _omdb_quota['exhausted'] = True
+            print(f"[ERROR] Movie not found: {error}")
             return None
 
         # Extract and return movie data
@@ -281,9 +547,440 @@ def fetch_omdb_data(title):
         print(f"[SUCCESS] Fetched data for: {title}")
         return movie_data
 
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] API request failed: {e}")
-        return None
     except (KeyError, ValueError) as e:
         print(f"[ERROR] Error parsing API response: {e}")
         return None
+
+
+def _omdb_limit_reached(response):
+    """True if an OMDB error response says the API key's request limit is used up."""
+    try:
+        return 'limit' in response.json().get('Error', '').lower()
+    except (ValueError, AttributeError):
+        return False
+
+
+def normalize_title(title):
+    """Cache key form of a title: lowercase with single spaces."""
+    return ' '.join(title.lower().split())
+
+
+def _count_omdb_cache(name):
+    with _omdb_lock:
+        _omdb_cache_stats[name] += 1
+
+
+def get_cached_omdb(title):
+    """
+    Return the cached raw OMDB response for title (a "Response": "False"
+    dict for cached misses), or None if it is not cached or has expired.
+    """
+    entry, stored_at = shared_store_get(OMDB_CACHE_PATH, 'omdb_title', normalize_title(title))
+    if entry is not None and 'imdbID' in entry:
+        data = get_cached_omdb_by_imdb_id(entry['imdbID'])
+        if data is not None:
+            _count_omdb_cache('hits')
+            return data
+    elif entry is not None and time.time() - stored_at <= OMDB_NEGATIVE_TTL:
+        _count_omdb_cache('negative_hits')
+        return entry
+
+    _count_omdb_cache('misses')
+    return None
+
+
+def get_cached_omdb_by_imdb_id(imdb_id):
+    """Return the cached raw OMDB response for an imdbID, or None if absent or expired."""
+    data, stored_at = shared_store_get(OMDB_CACHE_PATH, 'omdb_imdb', imdb_id)
+    if data is None or time.time() - stored_at > OMDB_CACHE_TTL:
+        return None
+    return data
+
+
+def store_omdb_response(title, data):
+    """
+    Cache a raw OMDB response: found movies under their imdbID (plus a
+    title -> imdbID entry), "Movie not found" answers under the title.
+    Quota and other API errors are not cached.
+    """
+    key = normalize_title(title)
+    if data.get('Response') == 'False':
+        if 'not found' not in data.get('Error', '').lower():
+            return
+        shared_store_set(OMDB_CACHE_PATH, 'omdb_title', key, data)
+    elif data.get('imdbID'):
+        shared_store_set(OMDB_CACHE_PATH, 'omdb_imdb', data['imdbID'], data)
+        shared_store_set(OMDB_CACHE_PATH, 'omdb_title', key, {'imdbID': data['imdbID']})
+    else:
+        return
+    _count_omdb_cache('stores')
+
+
+def _omdb_update_params(movie_data, movie_id):
+    """
+    Parameters for OMDB_UPDATE_QUERY from fetch_omdb_data() output. A
+    missing director is saved as 'N/A' so the movie counts as enriched.
+    """
+    return (
+        movie_data.get('director') or 'N/A',
+        movie_data.get('year'),
+        movie_data.get('plot'),
+        movie_data.get('poster'),
+        movie_data.get('actors'),
+        movie_data.get('genre'),
+        movie_id
+    )
+
+
+def _take_omdb_quota():
+    """Count one OMDB request against today's quota. Returns False once it is used up."""
+    today = datetime.now(timezone.utc).date()
+    with _omdb_lock:
+        if _omdb_quota['day'] != today:
+            _omdb_quota.update(day=today, used=0, exhausted=False)
+        if _omdb_quota['exhausted'] or _omdb_quota['used'] >= OMDB_DAILY_QUOTA:
+            _omdb_quota['exhausted'] = True
+            return False
+        _omdb_quota['used'] += 1
+        return True
+
+
+def omdb_quota_exhausted():
+    """True if OMDB requests are blocked for the rest of the UTC day."""
+    with _omdb_lock:
+        return _omdb_quota['exhausted'] and _omdb_quota['day'] == datetime.now(timezone.utc).date()
+
+
+def get_omdb_stats():
+    """Return today's OMDB quota usage, response cache and rate limiter counters."""
+    with _omdb_lock:
+        stats = {
+            'day': _omdb_quota['day'].isoformat() if _omdb_quota['day'] else None,
+            'used': _omdb_quota['used'],
+            'quota': OMDB_DAILY_QUOTA,
+            'exhausted': _omdb_quota['exhausted'],
+        }
+        stats['cache'] = dict(_omdb_cache_stats)
+    stats['cache']['path'] = OMDB_CACHE_PATH
+    stats['cache']['cache_only'] = OMDB_CACHE_ONLY
+    stats['rate_limiter'] = rate_limiter_stats(_omdb_limiter)
+    return stats
+
+
+def enrich_all_movies(connection, limit=None, progress=None, cache_only=False):
+    """
+    Fetch OMDB data for every movie that was never enriched (director and
+    year both NULL), OMDB_ENRICH_WORKERS at a time under the OMDB rate
+    limiter, saving each batch with one executemany UPDATE and commit.
+    An interrupted run resumes where it stopped, since saved movies no
+    longer match. Titles OMDB answered "Movie not found!" for are marked
+    with director 'N/A' so later runs don't spend quota on them again
+    (request errors are retried next run). Stops early when the daily
+    quota runs out.
+    progress, if given, is called with the report after each batch.
+    cache_only fills movies from the OMDB cache alone (no requests, no quota).
+    Returns a report dict: updated (count), failed (titles), skipped
+    (movies left for lack of quota), elapsed (seconds), rate (movies/sec).
+    """
+    started = time.perf_counter()
+
+    query = "SELECT movie_id, title FROM movies WHERE director IS NULL AND year IS NULL ORDER BY movie_id"
+    params = ()
+    if limit:
+        query += " LIMIT %s"
+        params = (limit,)
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        movies = cursor.fetchall()
+
+    report = {'updated': 0, 'failed': [], 'skipped': 0, 'elapsed': 0.0, 'rate': 0.0}
+
+    with ThreadPoolExecutor(max_workers=OMDB_ENRICH_WORKERS) as pool:
+        for start in range(0, len(movies), OMDB_ENRICH_BATCH_SIZE):
+            if not cache_only and omdb_quota_exhausted():
+                report['skipped'] += len(movies) - start
+                break
+
+            batch = movies[start:start + OMDB_ENRICH_BATCH_SIZE]
+            results = list(pool.map(lambda movie: fetch_omdb_data(movie['title'], cache_only=cache_only), batch))
+
+            # Misses after the quota ran out are left for the next run, not reported as failures
+            quota_hit = not cache_only and omdb_quota_exhausted()
+            rows = []
+            not_found = []
+            for movie, movie_data in zip(batch, results):
+                if movie_data is None and quota_hit:
+                    report['skipped'] += 1
+                elif movie_data is None:
+                    report['failed'].append(movie['title'])
+                    cached = get_cached_omdb(movie['title'])
+                    if cached is not None and cached.get('Response') == 'False':
+                        not_found.append((movie['movie_id'],))
+                else:
+                    rows.append(_omdb_update_params(movie_data, movie['movie_id']))
+
+            if rows or not_found:
+                try:
+                    with connection.cursor() as cursor:
+                        if rows:
+                            cursor.executemany(OMDB_UPDATE_QUERY, rows)
+                        if not_found:
+                            cursor.executemany(OMDB_NOT_FOUND_QUERY, not_found)
+                    connection.commit()
+                    invalidate_table_pages('movies')
+                except Exception:
+                    connection.rollback()
+                    raise
+                report['updated'] += len(rows)
+
+                # Pre-generate poster thumbnails for the saved movies
+                posters = [movie_data['poster'] for movie_data in results if movie_data and movie_data.get('poster')]
+                list(pool.map(cache_poster, posters))
+
+            report['elapsed'] = time.perf_counter() - started
+            report['rate'] = report['updated'] / report['elapsed'] if report['elapsed'] else 0.0
+            if progress:
+                progress(report)
+
+    report['elapsed'] = time.perf_counter() - started
+    report['rate'] = report['updated'] / report['elapsed'] if report['elapsed'] else 0.0
+    return report
+
+
+def _resize_poster(content, width):
+    """
+    Return JPEG bytes of the image scaled down to width (aspect kept), or
+    None when Pillow is not installed or the image cannot be decoded.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(content)) as image:
+            image = image.convert('RGB')
+            image.thumbnail((width, width * 4))
+            output = BytesIO()
+            image.save(output, format='JPEG', quality=85, optimize=True)
+            return output.getvalue()
+    except Exception as e:
+        print(f"[ERROR] Could not resize poster: {e}")
+        return None
+
+
+def _write_poster_file(filename, content):
+    """Write a poster file atomically (concurrent writers produce the same bytes)."""
+    path = os.path.join(POSTER_CACHE_DIR, filename)
+    if not os.path.exists(path):
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(content)
+        os.replace(temporary, path)
+
+
+def public_addresses(url):
+    """
+    Return the addresses url's host resolves to when url is http(s) and every
+    one of them is public, else None, so poster downloads cannot reach
+    localhost or internal services.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return None
+    try:
+        addresses = [address[4][0].split('%')[0] for address in
+                     socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)]
+    except (socket.gaierror, UnicodeError, ValueError):
+        return None
+    if not addresses or not all(ipaddress.ip_address(address).is_global for address in addresses):
+        return None
+    return addresses
+
+
+def _download_poster(url):
+    """Return the image bytes at url, or None if it is not a public, image/*, size-capped response."""
+    addresses = public_addresses(url)
+    if addresses is None:
+        with _poster_lock:
+            _poster_stats['rejected'] += 1
+        return None
+
+    try:
+        # Connect to the address just checked (a second DNS lookup could answer
+        # with an internal one), and no redirects: a public URL must not bounce
+        # the request to an internal host
+        with http_get_at(url, addresses[0], stream=True, allow_redirects=False) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code != 200 or not content_type.startswith('image/'):
+                print(f"[ERROR] Poster rejected: {response.status_code} {content_type or 'no content type'}")
+                with _poster_lock:
+                    _poster_stats['rejected'] += 1
+                return None
+
+            content = b''
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                if len(content) > POSTER_MAX_BYTES:
+                    print(f"[ERROR] Poster rejected: larger than {POSTER_MAX_BYTES} bytes")
+                    with _poster_lock:
+                        _poster_stats['rejected'] += 1
+                    return None
+            return content
+    except requests.exceptions.RequestException as e:
+        print(f"[ERROR] Poster download failed: {e}")
+        with _poster_lock:
+            _poster_stats['errors'] += 1
+        return None
+
+
+def cache_poster(url):
+    """
+    Download a poster once and store a JPEG thumbnail per POSTER_SIZES under
+    content-hash filenames. Returns {size: filename}, or None if the poster
+    could not be downloaded or decoded (or Pillow is not installed).
+    """
+    files, _ = shared_store_get(POSTER_INDEX_PATH, 'posters', url)
+    if files and all(name.endswith('.jpg') and os.path.exists(os.path.join(POSTER_CACHE_DIR, name))
+                     for name in files.values()):
+        with _poster_lock:
+            _poster_stats['hits'] += 1
+        return files
+
+    if Image is None:
+        return None
+
+    content = _download_poster(url)
+    if content is None:
+        return None
+
+    thumbnails = {size: _resize_poster(content, width) for size, width in POSTER_SIZES.items()}
+    if any(thumbnail is None for thumbnail in thumbnails.values()):
+        # Never store bytes that are not a decodable image
+        with _poster_lock:
+            _poster_stats['errors'] += 1
+        return None
+
+    os.makedirs(POSTER_CACHE_DIR, exist_ok=True)
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    files = {}
+    for size, thumbnail in thumbnails.items():
+        files[size] = f"{digest}_{size}.jpg"
+        _write_poster_file(files[size], thumbnail)
+
+    shared_store_set(POSTER_INDEX_PATH, 'posters', url, files)
+    with _poster_lock:
+        _poster_stats['generated'] += 1
+    return files
+
+
+def get_poster_stats():
+    """Return poster cache hits, generated thumbnails and download errors."""
+    with _poster_lock:
+        stats = dict(_poster_stats)
+    stats['resizing'] = Image is not None
+    return stats
+
+
+def fulltext_search(connection, query, page, per_page):
+    """
+    Rank movies with MySQL FULLTEXT (natural language mode).
+    Returns (total matches, results for the page). Raises pymysql errors,
+    including 1191 when the FULLTEXT index does not exist.
+    """
+    match = f"MATCH({', '.join(SEARCH_COLUMNS)}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS total FROM movies WHERE {match}", (query,))
+        total = cursor.fetchone()['total']
+
+        cursor.execute(f"""
+            SELECT movie_id, title, director, year, genre, poster, {match} AS score
+            FROM movies
+            WHERE {match}
+            ORDER BY score DESC, movie_id
+            LIMIT %s OFFSET %s
+        """, (query, query, per_page, (page - 1) * per_page))
+        rows = cursor.fetchall()
+
+    for row in rows:
+        row['score'] = round(float(row['score']), 4)
+    return total, rows
+
+
+def _search_terms(text):
+    """Lowercase word tokens of text, without stopwords and one-letter words."""
+    return [word for word in re.findall(r"[a-z0-9]+", (text or '').lower())
+            if len(word) > 1 and word not in SEARCH_STOPWORDS]
+
+
+def _build_search_index(connection):
+    """
+    Return the in-process inverted index, rebuilding it when the movies table
+    changed (row count or latest updated_at differs from the indexed version).
+    Only one thread rebuilds; concurrent searches wait for it and reuse the
+    result instead of each scanning the table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) AS total, MAX(updated_at) AS latest FROM movies")
+        row = cursor.fetchone()
+        version = (row['total'], row['latest'])
+
+    with _search_lock:
+        if _search_index['version'] == version:
+            return _search_index
+
+    with _search_build_lock:
+        # Another thread may have rebuilt it for this version while we waited
+        with _search_lock:
+            if _search_index['version'] == version:
+                return _search_index
+
+        # Streamed as tuples: only the postings and result fields are kept, never the plots
+        columns = ('movie_id', 'genre', 'year', 'poster') + SEARCH_COLUMNS
+        rows = stream_rows(connection, f"SELECT {', '.join(columns)} FROM movies", tuples=True)
+
+        postings = {}   # term -> {movie_id: weighted term frequency}
+        movies = {}
+        for values in rows:
+            row = dict(zip(columns, values))
+            for column in SEARCH_COLUMNS:
+                for term, count in Counter(_search_terms(row[column])).items():
+                    weights = postings.setdefault(term, {})
+                    weights[row['movie_id']] = weights.get(row['movie_id'], 0.0) + count * SEARCH_FIELD_WEIGHTS[column]
+            movies[row['movie_id']] = {key: row[key] for key in ('movie_id', 'title', 'director', 'year', 'genre', 'poster')}
+
+        with _search_lock:
+            _search_index.update(version=version, postings=postings, movies=movies)
+            _search_stats['index_builds'] += 1
+            return _search_index
+
+
+def fallback_search(connection, query, page, per_page):
+    """
+    Rank movies with the in-process inverted index (TF-IDF, title and
+    director matches weighted higher). Returns (total matches, page results).
+    """
+    index = _build_search_index(connection)
+    postings, movies = index['postings'], index['movies']
+    document_count = len(movies) or 1
+
+    scores = {}
+    for term in set(_search_terms(query)):
+        matches = postings.get(term)
+        if not matches:
+            continue
+        idf = math.log(1 + document_count / len(matches))
+        for movie_id, weight in matches.items():
+            scores[movie_id] = scores.get(movie_id, 0.0) + weight * idf
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    start = (page - 1) * per_page
+    results = [dict(movies[movie_id], score=round(score, 4)) for movie_id, score in ranked[start:start + per_page]]
+    return len(ranked), results
+
+
+def get_search_stats():
+    """Return how many searches used FULLTEXT vs the fallback index."""
+    with _search_lock:
+        stats = dict(_search_stats)
+        stats['indexed_movies'] = len(_search_index['movies'])
+    stats['fulltext_available'] = time.monotonic() >= _search_index['fulltext_retry_at']
+    return stats
@@ -1,45 +1,107 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from app.db_connect import get_db
+from app.db_connect import get_db, stream_rows
+from app.http_client import upstream_call
+from app.functions import make_cache, cache_get, cache_set, cache_stats, shared_store_get, shared_store_set
+from app.functions import datatables_page, select_columns, get_cached_page, store_cached_page, invalidate_table_pages
 import yfinance as yf
+import numpy as np
+import pandas as pd
+import os
+import threading
+import time
 
 tickers_bp = Blueprint('tickers', __name__)
 
+# yfinance does its own HTTP; calls are still capped and timed under this upstream name
+YAHOO_UPSTREAM = 'finance.yahoo.com'
+
+# Bulk refresh settings: symbols per yf.download call and download threads per call
+PRICE_BATCH_SIZE = int(os.getenv('PRICE_BATCH_SIZE', '100'))
+PRICE_BATCH_THREADS = int(os.getenv('PRICE_BATCH_THREADS', '8'))
+
+# Quote cache: fresh for QUOTE_CACHE_TTL seconds, then served stale (while a
+# background refresh runs) for QUOTE_CACHE_STALE_TTL more seconds.
+# Set QUOTE_CACHE_PATH to a SQLite file to share quotes between gunicorn workers.
+QUOTE_CACHE_TTL = float(os.getenv('QUOTE_CACHE_TTL', '60'))
+QUOTE_CACHE_STALE_TTL = float(os.getenv('QUOTE_CACHE_STALE_TTL', '900'))
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', '1000'))
+QUOTE_CACHE_PATH = os.getenv('QUOTE_CACHE_PATH')
+
+_quote_cache = make_cache(QUOTE_CACHE_MAX_ENTRIES, QUOTE_CACHE_TTL, QUOTE_CACHE_STALE_TTL)
+_refresh_lock = threading.Lock()
+_refreshing = set()
+_refresh_stats = {'background_refreshes': 0, 'shared_hits': 0}
+
+# Price analytics: moving-average windows (in samples) and memo of computed
+# stats keyed by (symbol, latest timestamp) so repeat views skip the math
+MOVING_AVERAGE_WINDOWS = (5, 20, 50)
+_stats_memo = make_cache(max_entries=500, ttl=float(os.getenv('PRICE_STATS_MEMO_TTL', '86400')))
+
+# Row schema of the tickers list: the only columns the list query (and the
+# edit/delete modals) select and tickers.html renders
+TICKERS_TABLE = {
+    'table': 'tickers',
+    'key': 'ticker_id',
+    'columns': ['ticker_id', 'symbol', 'name', 'price', 'updated_at', 'created_at'],
+    'orderable': ['ticker_id', 'symbol'],    # primary key, idx_tickers_symbol
+    'nullable': [],
+    'searchable': ['symbol'],
+    'default_order': 'symbol',
+}
+
 @tickers_bp.route('/tickers')
 def index():
-    """Display all tickers from database"""
-    connection = get_db()
-    result = []
+    """Display the tickers page; rows are loaded a page at a time from /tickers/data"""
     edit_ticker = None
     delete_ticker = None
 
     edit_id = request.args.get('edit_id')
     delete_id = request.args.get('delete_id')
 
+    if edit_id or delete_id:
+        # Only the edit/delete modals need the database; the table loads over AJAX
+        connection = get_db()
+        if connection is None:
+            flash("Database connection failed. Please check your database configuration.", "error")
+        else:
+            try:
+                if edit_id:
+                    query = f"SELECT {select_columns(TICKERS_TABLE)} FROM tickers WHERE ticker_id = %s"
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, (edit_id,))
+                        edit_ticker = cursor.fetchone()
+
+                if delete_id:
+                    query = f"SELECT {select_columns(TICKERS_TABLE)} FROM tickers WHERE ticker_id = %s"
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, (delete_id,))
+                        delete_ticker = cursor.fetchone()
+            except Exception as e:
+                flash(f"Database error: {e}", "error")
+
+    return render_template("tickers.html", table=TICKERS_TABLE, edit_ticker=edit_ticker, delete_ticker=delete_ticker)
+
+
+@tickers_bp.route('/tickers/data')
+def data():
+    """Return one page of tickers for DataTables (server-side processing), cached until the table changes"""
+    draw = request.args.get('draw', type=int, default=0)
+    key, page = get_cached_page('tickers', request.args)
+    if page is not None:
+        return jsonify(dict(page, draw=draw))
+
+    connection = get_db()
+
     if connection is None:
-        flash("Database connection failed. Please check your database configuration.", "error")
-    else:
-        try:
-            if edit_id:
-                query = "SELECT * FROM tickers WHERE ticker_id = %s"
-                with connection.cursor() as cursor:
-                    cursor.execute(query, (edit_id,))
-                    edit_ticker = cursor.fetchone()
-
-            if delete_id:
-                query = "SELECT * FROM tickers WHERE ticker_id = %s"
-                with connection.cursor() as cursor:
-                    cursor.execute(query, (delete_id,))
-                    delete_ticker = cursor.fetchone()
-
-            query = "SELECT * FROM tickers ORDER BY symbol"
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                result = cursor.fetchall()
-        except Exception as e:
-            flash(f"Database error: {e}", "error")
-            result = []
+        return jsonify(error="Database connection failed."), 503
+
+    try:
+        page = datatables_page(connection, TICKERS_TABLE, request.args)
+    except Exception as e:
+        return jsonify(error=f"Database error: {e}"), 500
 
-    return render_template("tickers.html", tickers=result, edit_ticker=edit_ticker, delete_ticker=delete_ticker)
+    store_cached_page('tickers', key, page)
+    return jsonify(page)
 
 
 @tickers_bp.route('/tickers/add', methods=['POST'])
@@ -67,6 +129,7 @@ def add_ticker():
         with connection.cursor() as cursor:
             cursor.execute(query, (symbol, name, price))
         connection.commit()
+        invalidate_table_pages('tickers')
 
         flash(f"Ticker {symbol} added successfully!", "success")
     except Exception as e:
@@ -75,6 +138,32 @@ def add_ticker():
     return redirect(url_for('tickers.index'))
 
 
+@tickers_bp.route('/tickers/update/all')
+def update_all_prices():
+    """Fetch live prices for every ticker in one batched download and save them together"""
+    connection = get_db()
+
+    if connection is None:
+        flash("Database connection failed.", "error")
+        return redirect(url_for('tickers.index'))
+
+    try:
+        report = refresh_all_prices(connection)
+
+        if not report['updated'] and not report['failed']:
+            flash("No tickers to update.", "error")
+        elif report['failed']:
+            flash(f"Updated {len(report['updated'])} price(s) in {report['elapsed']:.2f}s. "
+                  f"Could not fetch: {', '.join(report['failed'])}", "error")
+        else:
+            flash(f"Updated {len(report['updated'])} price(s) in {report['elapsed']:.2f}s.", "success")
+
+    except Exception as e:
+        flash(f"Error updating prices: {e}", "error")
+
+    return redirect(url_for('tickers.index'))
+
+
 @tickers_bp.route('/tickers/update/<int:ticker_id>')
 def update_price(ticker_id):
     """Fetch live price from API and update database with new price"""
@@ -97,8 +186,8 @@ def update_price(ticker_id):
 
         symbol = ticker['symbol']
 
-        # Fetch live price from API
-        live_price = fetch_live_price(symbol)
+        # Get live price (served from the quote cache when recently fetched)
+        live_price = get_quote(symbol)
 
         if live_price is None:
             flash(f"Could not fetch live price for {symbol}.", "error")
@@ -113,6 +202,7 @@ def update_price(ticker_id):
         with connection.cursor() as cursor:
             cursor.execute(update_query, (live_price, ticker_id))
         connection.commit()
+        invalidate_table_pages('tickers')
 
         flash(f"Price updated for {symbol}: ${live_price:.2f}", "success")
 
@@ -122,6 +212,49 @@ def update_price(ticker_id):
     return redirect(url_for('tickers.index'))
 
 
+@tickers_bp.route('/tickers/cache/stats')
+def quote_cache_stats():
+    """Return quote cache hit/miss/eviction counters as JSON"""
+    stats = cache_stats(_quote_cache)
+    stats.update(_refresh_stats)
+    stats['ttl'] = QUOTE_CACHE_TTL
+    stats['stale_ttl'] = QUOTE_CACHE_STALE_TTL
+    stats['shared'] = bool(QUOTE_CACHE_PATH)
+    return jsonify(stats)
+
+
+@tickers_bp.route('/tickers/<symbol>/stats')
+def price_stats(symbol):
+    """Return returns, moving averages, volatility and max drawdown for a symbol as JSON"""
+    connection = get_db()
+
+    if connection is None:
+        return jsonify(error="Database connection failed."), 503
+
+    symbol = symbol.upper()
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT MAX(ts) AS latest FROM ticker_prices WHERE symbol = %s", (symbol,))
+            latest = cursor.fetchone()['latest']
+
+        if latest is None:
+            return jsonify(error=f"No price history for {symbol}."), 404
+
+        memo_key = (symbol, latest)
+        stats, state = cache_get(_stats_memo, memo_key)
+        if state != 'fresh':
+            rows = stream_rows(connection, "SELECT ts, price FROM ticker_prices WHERE symbol = %s ORDER BY ts",
+                               (symbol,), tuples=True)
+            stats = compute_price_stats(symbol, rows)
+            cache_set(_stats_memo, memo_key, stats)
+
+        return jsonify(stats)
+
+    except Exception as e:
+        return jsonify(error=f"Database error: {e}"), 500
+
+
 @tickers_bp.route('/tickers/edit/<int:ticker_id>', methods=['POST'])
 def edit_ticker(ticker_id):
     """Edit existing ticker"""
@@ -148,6 +281,7 @@ def edit_ticker(ticker_id):
         with connection.cursor() as cursor:
             cursor.execute(query, (symbol, name, price, ticker_id))
         connection.commit()
+        invalidate_table_pages('tickers')
 
         flash(f"Ticker {symbol} updated successfully!", "success")
     except Exception as e:
@@ -170,6 +304,7 @@ def delete_ticker(ticker_id):
         with connection.cursor() as cursor:
             cursor.execute(query, (ticker_id,))
         connection.commit()
+        invalidate_table_pages('tickers')
 
         flash("Ticker deleted successfully!", "success")
     except Exception as e:
@@ -185,7 +320,8 @@ def fetch_live_price(symbol):
     """
     try:
         ticker = yf.Ticker(symbol)
-        data = ticker.info
+        with upstream_call(YAHOO_UPSTREAM):
+            data = ticker.info
 
         # Try to get current price (prioritize currentPrice, fallback to regularMarketPrice)
         price = data.get('currentPrice') or data.get('regularMarketPrice')
@@ -199,3 +335,238 @@ def fetch_live_price(symbol):
     except Exception as e:
         print(f"Error fetching price for {symbol}: {e}")
         return None
+
+
+def get_quote(symbol):
+    """
+    Return the price for symbol through the quote cache.
+    Fresh hits return immediately, stale hits return the last price and
+    refresh it in a background thread, misses fetch from Yahoo synchronously.
+    Returns None if no price is available.
+    """
+    symbol = symbol.upper()
+    price, state = cache_get(_quote_cache, symbol)
+
+    if state == 'miss' and QUOTE_CACHE_PATH:
+        price, state = _load_shared_quote(symbol)
+
+    if state == 'fresh':
+        return price
+    if state == 'stale':
+        _refresh_quote_in_background(symbol)
+        return price
+
+    price = fetch_live_price(symbol)
+    if price is not None:
+        store_quote(symbol, price)
+    return price
+
+
+def store_quote(symbol, price, stored_at=None):
+    """Put a freshly fetched price in the local (and shared, if configured) quote cache."""
+    stored_at = time.time() if stored_at is None else stored_at
+    cache_set(_quote_cache, symbol.upper(), price, stored_at=stored_at)
+    if QUOTE_CACHE_PATH:
+        shared_store_set(QUOTE_CACHE_PATH, 'quotes', symbol.upper(), price, stored_at=stored_at)
+
+
+def _load_shared_quote(symbol):
+    """Copy a quote another worker cached into the local cache. Returns (price, state)."""
+    price, stored_at = shared_store_get(QUOTE_CACHE_PATH, 'quotes', symbol)
+    if price is None:
+        return None, 'miss'
+
+    age = time.time() - stored_at
+    if age > QUOTE_CACHE_TTL + QUOTE_CACHE_STALE_TTL:
+        return None, 'miss'
+
+    cache_set(_quote_cache, symbol, price, stored_at=stored_at)
+    with _refresh_lock:
+        _refresh_stats['shared_hits'] += 1
+    return price, 'fresh' if age <= QUOTE_CACHE_TTL else 'stale'
+
+
+def _refresh_quote_in_background(symbol):
+    """Start one background fetch per symbol; duplicate requests are ignored."""
+    with _refresh_lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+        _refresh_stats['background_refreshes'] += 1
+
+    def refresh():
+        try:
+            price = fetch_live_price(symbol)
+            if price is not None:
+                store_quote(symbol, price)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(symbol)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def fetch_live_prices(symbols, bar_times=None):
+    """
+    Fetch live prices for many symbols with batched yf.download calls
+    (PRICE_BATCH_SIZE symbols per call, PRICE_BATCH_THREADS threads each).
+    Returns a dict of symbol -> price; symbols without data are left out.
+    If a dict is passed as bar_times it is filled with symbol -> the
+    (naive UTC) timestamp of the daily bar each price was taken from.
+    """
+    unique_symbols = sorted(set(symbols))
+    prices = {}
+
+    for start in range(0, len(unique_symbols), PRICE_BATCH_SIZE):
+        batch = unique_symbols[start:start + PRICE_BATCH_SIZE]
+        try:
+            with upstream_call(YAHOO_UPSTREAM):
+                data = yf.download(
+                    batch,
+                    period='5d',
+                    interval='1d',
+                    group_by='ticker',
+                    threads=min(PRICE_BATCH_THREADS, len(batch)),
+                    auto_adjust=False,
+                    progress=False
+                )
+        except Exception as e:
+            print(f"Error downloading prices for {len(batch)} symbols: {e}")
+            continue
+
+        for symbol in batch:
+            bar = _last_close(data, symbol)
+            if bar is not None:
+                prices[symbol], bar_time = bar
+                store_quote(symbol, prices[symbol])
+                if bar_times is not None:
+                    bar_times[symbol] = bar_time
+
+    return prices
+
+
+def _last_close(data, symbol):
+    """Return (close, bar timestamp) of symbol's most recent bar in a yf.download frame, or None."""
+    if data is None or data.empty:
+        return None
+
+    if isinstance(data.columns, pd.MultiIndex):
+        if symbol not in data.columns.get_level_values(0):
+            return None
+        closes = data[symbol]['Close']
+    elif 'Close' in data.columns:
+        closes = data['Close']
+    else:
+        return None
+
+    closes = closes.dropna()
+    if closes.empty:
+        return None
+    bar_time = pd.Timestamp(closes.index[-1])
+    if bar_time.tzinfo is not None:
+        bar_time = bar_time.tz_convert('UTC').tz_localize(None)
+    return float(closes.iloc[-1]), bar_time.to_pydatetime()
+
+
+def save_prices(connection, prices, history_ts=None):
+    """
+    Write many symbol -> price pairs with a single executemany UPDATE in one
+    transaction. When history_ts (symbol -> bar timestamp) is given the prices
+    are also written to ticker_prices in the same transaction; a bar that is
+    already stored just has its price updated. Rolls back and re-raises on failure.
+    """
+    if not prices:
+        return 0
+
+    update_query = """
+    UPDATE tickers
+    SET price = %s
+    WHERE symbol = %s
+    """
+    history_query = """
+    INSERT INTO ticker_prices (symbol, ts, price)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE price = VALUES(price)
+    """
+    try:
+        with connection.cursor() as cursor:
+            if history_ts is not None:
+                cursor.executemany(history_query, [(symbol, history_ts[symbol], price)
+                                                   for symbol, price in prices.items() if symbol in history_ts])
+            cursor.executemany(update_query, [(price, symbol) for symbol, price in prices.items()])
+        connection.commit()
+        invalidate_table_pages('tickers')
+    except Exception:
+        connection.rollback()
+        raise
+    return len(prices)
+
+
+def refresh_all_prices(connection, record_history=False):
+    """
+    Refresh the price of every ticker in the database, optionally appending
+    the quotes to the ticker_prices history table. History rows are keyed
+    by the quote's own daily bar, so polling a closed market (or polling
+    more than once a day) updates that bar instead of adding repeats.
+    Returns a report dict: updated (symbol -> price), failed (symbols), elapsed (seconds).
+    """
+    started = time.perf_counter()
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT symbol FROM tickers ORDER BY symbol")
+        symbols = [row['symbol'] for row in cursor.fetchall()]
+
+    history_ts = {} if record_history else None
+    prices = fetch_live_prices(symbols, history_ts)
+    save_prices(connection, prices, history_ts)
+
+    return {
+        'updated': prices,
+        'failed': [symbol for symbol in symbols if symbol not in prices],
+        'elapsed': time.perf_counter() - started
+    }
+
+
+def compute_price_stats(symbol, rows):
+    """
+    Compute summary analytics over a symbol's full price history with
+    vectorized pandas operations. rows is an iterable of (ts, price) tuples
+    or {'ts', 'price'} dicts in time order. Returns a JSON-ready dict (None where not computable).
+    """
+    history = pd.DataFrame.from_records(rows, columns=['ts', 'price'])
+    prices = pd.Series(history['price'].astype(float).to_numpy(), index=pd.to_datetime(history['ts']))
+
+    returns = prices.pct_change().dropna()
+    drawdown = prices / prices.cummax() - 1.0
+    moving_averages = {
+        f"sma_{window}": prices.rolling(window).mean().iloc[-1] if len(prices) >= window else None
+        for window in MOVING_AVERAGE_WINDOWS
+    }
+
+    stats = {
+        'symbol': symbol,
+        'observations': int(len(prices)),
+        'first_ts': prices.index[0].isoformat(),
+        'last_ts': prices.index[-1].isoformat(),
+        'last_price': prices.iloc[-1],
+        'min_price': prices.min(),
+        'max_price': prices.max(),
+        'total_return': prices.iloc[-1] / prices.iloc[0] - 1.0,
+        'mean_return': returns.mean() if len(returns) else None,
+        'volatility': returns.std() if len(returns) > 1 else None,
+        'max_drawdown': drawdown.min(),
+        'moving_averages': moving_averages
+    }
+    return _json_ready(stats)
+
+
+def _json_ready(value):
+    """Convert NumPy scalars to plain numbers and NaN to None, recursively, for jsonify."""
+    if isinstance(value, dict):
+        return {key: _json_ready(item) for key, item in value.items()}
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    value = float(value)
+    return None if np.isnan(value) else round(value, 6)
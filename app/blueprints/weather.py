@@ -1,45 +1,117 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from app.db_connect import get_db
+from app.http_client import http_get
+from app.functions import make_rate_limiter, acquire_token, rate_limiter_stats
+from app.functions import make_cache, cache_get, cache_set, cache_delete, cache_stats
+from app.functions import datatables_page, select_columns, get_cached_page, store_cached_page, invalidate_table_pages
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import os
+import re
+import threading
+import time
+import pymysql
 import requests
 
 weather_bp = Blueprint('weather', __name__)
 
+NWS_HEADERS = {
+    'User-Agent': 'WeatherApp/1.0',
+    'Accept': 'application/json'
+}
+
+# A token bucket per host on top of the shared HTTP client:
+# Nominatim's usage policy allows 1 request/second, NWS is more lenient.
+WEATHER_REFRESH_WORKERS = int(os.getenv('WEATHER_REFRESH_WORKERS', '8'))
+_host_limiters = {
+    'nominatim.openstreetmap.org': make_rate_limiter(float(os.getenv('NOMINATIM_RATE', '1')), burst=1),
+    'api.weather.gov': make_rate_limiter(float(os.getenv('NWS_RATE', '5')), burst=5),
+}
+
+# Forecast responses keyed by forecast URL. Each entry is fresh for as long
+# as NWS's Cache-Control/Expires allows, then kept (as "stale") for up to
+# FORECAST_REVALIDATE_WINDOW seconds so it can be revalidated with
+# If-None-Match/If-Modified-Since instead of downloaded again.
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv('FORECAST_CACHE_MAX_ENTRIES', '500'))
+FORECAST_REVALIDATE_WINDOW = float(os.getenv('FORECAST_REVALIDATE_WINDOW', '86400'))
+_forecast_cache = make_cache(FORECAST_CACHE_MAX_ENTRIES, ttl=0, stale_ttl=FORECAST_REVALIDATE_WINDOW)
+_forecast_lock = threading.Lock()
+_forecast_stats = {
+    'requests': 0,
+    'served_from_cache': 0,
+    'revalidations': 0,
+    'not_modified': 0,
+    'bytes_downloaded': 0,
+    'bytes_saved': 0,
+    'round_trips_saved': 0,
+}
+
+# Row schema of the weather list: the only columns the list query (and the
+# edit/delete modals) select and weather.html renders
+WEATHER_TABLE = {
+    'table': 'weather',
+    'key': 'weather_id',
+    'columns': ['weather_id', 'city', 'state', 'temperature', 'updated_at', 'created_at'],
+    'orderable': ['weather_id', 'city'],     # primary key, idx_weather_city
+    'nullable': [],
+    'searchable': ['city'],
+    'default_order': 'city',
+}
+
 @weather_bp.route('/weather')
 def index():
-    """Display all weather records"""
-    connection = get_db()
-    result = []
+    """Display the weather page; rows are loaded a page at a time from /weather/data"""
     edit_weather = None
     delete_weather = None
 
     edit_id = request.args.get('edit_id')
     delete_id = request.args.get('delete_id')
 
+    if edit_id or delete_id:
+        # Only the edit/delete modals need the database; the table loads over AJAX
+        connection = get_db()
+        if connection is None:
+            flash("Database connection failed. Please check your database configuration.", "error")
+        else:
+            try:
+                if edit_id:
+                    query = f"SELECT {select_columns(WEATHER_TABLE)} FROM weather WHERE weather_id = %s"
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, (edit_id,))
+                        edit_weather = cursor.fetchone()
+
+                if delete_id:
+                    query = f"SELECT {select_columns(WEATHER_TABLE)} FROM weather WHERE weather_id = %s"
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, (delete_id,))
+                        delete_weather = cursor.fetchone()
+            except Exception as e:
+                flash(f"Database error: {e}", "error")
+
+    return render_template("weather.html", table=WEATHER_TABLE, edit_weather=edit_weather, delete_weather=delete_weather)
+
+
+@weather_bp.route('/weather/data')
+def data():
+    """Return one page of weather records for DataTables (server-side processing), cached until the table changes"""
+    draw = request.args.get('draw', type=int, default=0)
+    key, page = get_cached_page('weather', request.args)
+    if page is not None:
+        return jsonify(dict(page, draw=draw))
+
+    connection = get_db()
+
     if connection is None:
-        flash("Database connection failed. Please check your database configuration.", "error")
-    else:
-        try:
-            if edit_id:
-                query = "SELECT * FROM weather WHERE weather_id = %s"
-                with connection.cursor() as cursor:
-                    cursor.execute(query, (edit_id,))
-                    edit_weather = cursor.fetchone()
-
-            if delete_id:
-                query = "SELECT * FROM weather WHERE weather_id = %s"
-                with connection.cursor() as cursor:
-                    cursor.execute(query, (delete_id,))
-                    delete_weather = cursor.fetchone()
-
-            query = "SELECT * FROM weather ORDER BY city"
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                result = cursor.fetchall()
-        except Exception as e:
-            flash(f"Database error: {e}", "error")
-            result = []
+        return jsonify(error="Database connection failed."), 503
+
+    try:
+        page = datatables_page(connection, WEATHER_TABLE, request.args)
+    except Exception as e:
+        return jsonify(error=f"Database error: {e}"), 500
 
-    return render_template("weather.html", weather_records=result, edit_weather=edit_weather, delete_weather=delete_weather)
+    store_cached_page('weather', key, page)
+    return jsonify(page)
 
 
 @weather_bp.route('/weather/add', methods=['POST'])
@@ -67,6 +139,7 @@ def add_weather():
         with connection.cursor() as cursor:
             cursor.execute(query, (city, state, temperature))
         connection.commit()
+        invalidate_table_pages('weather')
 
         flash(f"Weather for {city} added successfully! Click 'Update Weather' to fetch live data.", "success")
     except Exception as e:
@@ -75,6 +148,32 @@ def add_weather():
     return redirect(url_for('weather.index'))
 
 
+@weather_bp.route('/weather/update/all')
+def update_all_weather():
+    """Fetch live weather for every city concurrently and save all temperatures together"""
+    connection = get_db()
+
+    if connection is None:
+        flash("Database connection failed.", "error")
+        return redirect(url_for('weather.index'))
+
+    try:
+        report = refresh_all_weather(connection)
+
+        if not report['updated'] and not report['failed']:
+            flash("No weather records to update.", "error")
+        elif report['failed']:
+            flash(f"Updated {len(report['updated'])} record(s) in {report['elapsed']:.2f}s. "
+                  f"Could not fetch: {', '.join(report['failed'])}", "error")
+        else:
+            flash(f"Updated {len(report['updated'])} record(s) in {report['elapsed']:.2f}s.", "success")
+
+    except Exception as e:
+        flash(f"Error updating weather: {e}", "error")
+
+    return redirect(url_for('weather.index'))
+
+
 @weather_bp.route('/weather/update/<int:weather_id>')
 def update_weather(weather_id):
     """Fetch live weather from API and update database"""
@@ -99,7 +198,7 @@ def update_weather(weather_id):
         state = weather['state']
 
         # Fetch live weather from API
-        live_temp = fetch_live_weather(city, state)
+        live_temp = fetch_live_weather(city, state, connection)
 
         if live_temp is None:
             state_text = f", {state}" if state else ""
@@ -115,6 +214,7 @@ def update_weather(weather_id):
         with connection.cursor() as cursor:
             cursor.execute(update_query, (live_temp, weather_id))
         connection.commit()
+        invalidate_table_pages('weather')
 
         flash(f"Weather updated for {city}: {live_temp:.1f}°F", "success")
 
@@ -124,6 +224,12 @@ def update_weather(weather_id):
     return redirect(url_for('weather.index'))
 
 
+@weather_bp.route('/weather/stats')
+def weather_stats():
+    """Return forecast cache and outbound rate limiter counters as JSON"""
+    return jsonify(forecast_cache=get_forecast_cache_stats(), rate_limiters=get_rate_limiter_stats())
+
+
 @weather_bp.route('/weather/edit/<int:weather_id>', methods=['POST'])
 def edit_weather(weather_id):
     """Edit existing weather record"""
@@ -150,6 +256,7 @@ def edit_weather(weather_id):
         with connection.cursor() as cursor:
             cursor.execute(query, (city, state, temperature, weather_id))
         connection.commit()
+        invalidate_table_pages('weather')
 
         flash(f"Weather for {city} updated successfully!", "success")
     except Exception as e:
@@ -172,6 +279,7 @@ def delete_weather(weather_id):
         with connection.cursor() as cursor:
             cursor.execute(query, (weather_id,))
         connection.commit()
+        invalidate_table_pages('weather')
 
         flash("Weather record deleted successfully!", "success")
     except Exception as e:
@@ -180,7 +288,162 @@ def delete_weather(weather_id):
     return redirect(url_for('weather.index'))
 
 
-def fetch_live_weather(city, state=None):
+def location_key(city, state=None):
+    """Normalize city/state into the weather_locations cache key, e.g. 'macon|georgia'."""
+    city = ' '.join((city or '').lower().split())
+    state = ' '.join((state or '').lower().split())
+    return f"{city}|{state}"
+
+
+def weather_get(url, **kwargs):
+    """GET url with the shared HTTP client after taking a token from that host's rate limiter."""
+    limiter = _host_limiters.get(urlsplit(url).hostname)
+    if limiter is not None:
+        acquire_token(limiter)
+    return http_get(url, **kwargs)
+
+
+def _count_forecast(**increments):
+    """Add to the forecast cache counters."""
+    with _forecast_lock:
+        for name, amount in increments.items():
+            _forecast_stats[name] += amount
+
+
+def _freshness_lifetime(response):
+    """
+    Seconds a response may be served without revalidation, from
+    Cache-Control max-age (minus Age) or Expires - Date. 0 if uncacheable.
+    """
+    cache_control = response.headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0.0
+
+    max_age = re.search(r'(?:s-maxage|max-age)=(\d+)', cache_control)
+    if max_age:
+        age = float(response.headers.get('Age', '0') or 0)
+        return max(0.0, float(max_age.group(1)) - age)
+
+    try:
+        expires = parsedate_to_datetime(response.headers['Expires'])
+        date = parsedate_to_datetime(response.headers['Date']) if 'Date' in response.headers else None
+        if date is None:
+            return max(0.0, expires.timestamp() - time.time())
+        return max(0.0, (expires - date).total_seconds())
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def get_forecast(forecast_url):
+    """
+    GET a forecast through the HTTP-aware cache.
+    Fresh entries are returned without a request; expired ones are
+    revalidated with their ETag/Last-Modified (a 304 reuses the cached body).
+    Redirects are not followed. Returns (forecast JSON or None, HTTP status).
+    """
+    entry, state = cache_get(_forecast_cache, forecast_url)
+
+    if state == 'fresh':
+        _count_forecast(served_from_cache=1, round_trips_saved=1, bytes_saved=entry['size'])
+        return entry['data'], 200
+
+    headers = dict(NWS_HEADERS)
+    if state == 'stale':
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        _count_forecast(revalidations=1)
+
+    response = weather_get(forecast_url, headers=headers, timeout=10, allow_redirects=False)
+    _count_forecast(requests=1, bytes_downloaded=len(response.content))
+
+    if response.status_code == 304 and state == 'stale':
+        _count_forecast(not_modified=1, bytes_saved=entry['size'])
+        cache_set(_forecast_cache, forecast_url, entry, ttl=_freshness_lifetime(response))
+        return entry['data'], 200
+
+    if response.status_code in (301, 404):
+        cache_delete(_forecast_cache, forecast_url)
+        return None, response.status_code
+
+    response.raise_for_status()
+    data = response.json()
+
+    if response.headers.get('ETag') or response.headers.get('Last-Modified') or _freshness_lifetime(response):
+        cache_set(_forecast_cache, forecast_url, {
+            'data': data,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': len(response.content)
+        }, ttl=_freshness_lifetime(response))
+
+    return data, response.status_code
+
+
+def get_forecast_cache_stats():
+    """Return forecast cache counters, including bytes and round-trips saved."""
+    with _forecast_lock:
+        stats = dict(_forecast_stats)
+    stats.update(cache_stats(_forecast_cache))
+    return stats
+
+
+def get_rate_limiter_stats():
+    """Return per-host rate limiter counters."""
+    return {host: rate_limiter_stats(limiter) for host, limiter in _host_limiters.items()}
+
+
+def lookup_location(connection, key):
+    """Return the cached location row for key, or None (also when the table is missing)."""
+    try:
+        query = "SELECT * FROM weather_locations WHERE location_key = %s"
+        with connection.cursor() as cursor:
+            cursor.execute(query, (key,))
+            return cursor.fetchone()
+    except pymysql.err.MySQLError as e:
+        print(f"[ERROR] Location cache lookup failed: {e}")
+        return None
+
+
+def store_location(connection, key, location):
+    """Insert or refresh a resolved location (coordinates + NWS grid URLs) in the cache."""
+    try:
+        query = """
+        INSERT INTO weather_locations (location_key, latitude, longitude, grid_id, grid_x, grid_y, forecast_url)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE latitude = VALUES(latitude), longitude = VALUES(longitude),
+            grid_id = VALUES(grid_id), grid_x = VALUES(grid_x), grid_y = VALUES(grid_y),
+            forecast_url = VALUES(forecast_url)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(query, (
+                key,
+                location['latitude'],
+                location['longitude'],
+                location.get('grid_id'),
+                location.get('grid_x'),
+                location.get('grid_y'),
+                location['forecast_url']
+            ))
+        connection.commit()
+    except pymysql.err.MySQLError as e:
+        print(f"[ERROR] Location cache write failed: {e}")
+        connection.rollback()
+
+
+def invalidate_location(connection, key):
+    """Forget a cached location whose NWS grid has gone stale."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM weather_locations WHERE location_key = %s", (key,))
+        connection.commit()
+    except pymysql.err.MySQLError as e:
+        print(f"[ERROR] Location cache delete failed: {e}")
+        connection.rollback()
+
+
+def fetch_live_weather(city, state=None, connection=None):
     """
     Fetch live weather from National Weather Service API (weather.gov)
     This is free and requires no API key!
@@ -190,6 +453,10 @@ def fetch_live_weather(city, state=None):
     2. Get NWS grid points for those coordinates
     3. Fetch the forecast and extract current temperature
 
+    When a database connection is passed, steps 1-2 are cached in the
+    weather_locations table, so a warm update is a single forecast request.
+    A cached grid that NWS answers with 404/301 is dropped and re-resolved.
+
     Error Handling:
     - City not found: Returns None
     - API timeout: Returns None
@@ -198,76 +465,26 @@ def fetch_live_weather(city, state=None):
     - Network errors: Returns None
     """
     try:
-        # Step 1: Get coordinates from city/state using Nominatim
-        geocode_url = 'https://nominatim.openstreetmap.org/search'
-        location_query = f"{city}, {state}, USA" if state else f"{city}, USA"
-        params = {
-            'q': location_query,
-            'format': 'json',
-            'limit': 1
-        }
-        headers = {
-            'User-Agent': 'WeatherApp/1.0'  # Required by Nominatim
-        }
-
-        geo_response = requests.get(geocode_url, params=params, headers=headers, timeout=10)
-        geo_response.raise_for_status()
-        geo_data = geo_response.json()
-
-        if not geo_data:
-            print(f"[ERROR] City not found in geocoding: {city}, {state}")
-            return None
-
-        lat = geo_data[0]['lat']
-        lon = geo_data[0]['lon']
-        print(f"[INFO] Found coordinates for {city}: {lat}, {lon}")
-
-        # Step 2: Get NWS grid points
-        points_url = f'https://api.weather.gov/points/{lat},{lon}'
-        points_headers = {
-            'User-Agent': 'WeatherApp/1.0',
-            'Accept': 'application/json'
-        }
-
-        points_response = requests.get(points_url, headers=points_headers, timeout=10)
-
-        # Check for specific HTTP errors
-        if points_response.status_code == 404:
-            print(f"[ERROR] Location not supported by NWS (possibly outside US): {city}")
-            return None
-        elif points_response.status_code == 429:
-            print(f"[ERROR] Rate limit exceeded for NWS API")
-            return None
-
-        points_response.raise_for_status()
-        points_data = points_response.json()
-
-        if 'properties' not in points_data or 'forecast' not in points_data['properties']:
-            print(f"[ERROR] Invalid response from NWS points API for {city}")
-            return None
-
-        forecast_url = points_data['properties']['forecast']
-        print(f"[INFO] Forecast URL: {forecast_url}")
-
-        # Step 3: Get the forecast
-        forecast_response = requests.get(forecast_url, headers=points_headers, timeout=10)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
-
-        # Extract current temperature from the first period
-        if 'properties' not in forecast_data or 'periods' not in forecast_data['properties']:
-            print(f"[ERROR] Invalid forecast data structure for {city}")
-            return None
-
-        periods = forecast_data['properties']['periods']
-        if not periods or len(periods) == 0:
-            print(f"[ERROR] No forecast periods available for {city}")
+        key = location_key(city, state)
+        location = lookup_location(connection, key) if connection is not None else None
+
+        if location:
+            print(f"[INFO] Using cached forecast URL for {city}")
+            current_temp, status = fetch_forecast_temperature(location['forecast_url'], city)
+            if status not in (301, 404):
+                return current_temp
+            print(f"[INFO] Cached NWS grid for {city} is stale (HTTP {status}), resolving again")
+            invalidate_location(connection, key)
+
+        location = resolve_location(city, state)
+        if location is None:
             return None
 
-        current_temp = periods[0]['temperature']
-        print(f"[SUCCESS] Current temperature for {city}: {current_temp}°F")
+        if connection is not None:
+            store_location(connection, key, location)
 
-        return float(current_temp)
+        current_temp, status = fetch_forecast_temperature(location['forecast_url'], city)
+        return current_temp
 
     except requests.exceptions.Timeout as e:
         print(f"[ERROR] Request timeout for {city}: {e}")
@@ -281,3 +498,231 @@ def fetch_live_weather(city, state=None):
     except (KeyError, ValueError, IndexError, TypeError) as e:
         print(f"[ERROR] Error parsing API response for {city}: {e}")
         return None
+
+
+def resolve_location(city, state=None):
+    """
+    Steps 1-2: geocode city/state with Nominatim, then look up the NWS grid.
+    Returns a dict with latitude, longitude, grid_id, grid_x, grid_y and
+    forecast_url, or None if the location cannot be resolved.
+    Request errors are raised to the caller.
+    """
+    # Step 1: Get coordinates from city/state using Nominatim
+    geocode_url = 'https://nominatim.openstreetmap.org/search'
+    location_query = f"{city}, {state}, USA" if state else f"{city}, USA"
+    params = {
+        'q': location_query,
+        'format': 'json',
+        'limit': 1
+    }
+    headers = {
+        'User-Agent': 'WeatherApp/1.0'  # Required by Nominatim
+    }
+
+    geo_response = weather_get(geocode_url, params=params, headers=headers, timeout=10)
+    geo_response.raise_for_status()
+    geo_data = geo_response.json()
+
+    if not geo_data:
+        print(f"[ERROR] City not found in geocoding: {city}, {state}")
+        return None
+
+    # NWS only accepts 4 decimal places (more gets a 301 redirect)
+    lat = round(float(geo_data[0]['lat']), 4)
+    lon = round(float(geo_data[0]['lon']), 4)
+    print(f"[INFO] Found coordinates for {city}: {lat}, {lon}")
+
+    # Step 2: Get NWS grid points
+    points_url = f'https://api.weather.gov/points/{lat},{lon}'
+    points_response = weather_get(points_url, headers=NWS_HEADERS, timeout=10)
+
+    # Check for specific HTTP errors
+    if points_response.status_code == 404:
+        print(f"[ERROR] Location not supported by NWS (possibly outside US): {city}")
+        return None
+    elif points_response.status_code == 429:
+        print(f"[ERROR] Rate limit exceeded for NWS API")
+        return None
+
+    points_response.raise_for_status()
+    points_data = points_response.json()
+
+    if 'properties' not in points_data or 'forecast' not in points_data['properties']:
+        print(f"[ERROR] Invalid response from NWS points API for {city}")
+        return None
+
+    properties = points_data['properties']
+    print(f"[INFO] Forecast URL: {properties['forecast']}")
+
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'grid_id': properties.get('gridId'),
+        'grid_x': properties.get('gridX'),
+        'grid_y': properties.get('gridY'),
+        'forecast_url': properties['forecast']
+    }
+
+
+def fetch_forecast_temperature(forecast_url, city):
+    """
+    Step 3: get the forecast (through the forecast cache) and extract the
+    current temperature. Redirects are not followed so a moved grid can be
+    detected. Returns (temperature or None, HTTP status code).
+    """
+    forecast_data, status = get_forecast(forecast_url)
+
+    if forecast_data is None:
+        return None, status
+
+    # Extract current temperature from the first period
+    if 'properties' not in forecast_data or 'periods' not in forecast_data['properties']:
+        print(f"[ERROR] Invalid forecast data structure for {city}")
+        return None, status
+
+    periods = forecast_data['properties']['periods']
+    if not periods or len(periods) == 0:
+        print(f"[ERROR] No forecast periods available for {city}")
+        return None, status
+
+    current_temp = periods[0]['temperature']
+    print(f"[SUCCESS] Current temperature for {city}: {current_temp}°F")
+
+    return float(current_temp), status
+
+
+def lookup_locations(connection, keys):
+    """Return cached location rows for many keys in one query, as a dict keyed by location_key."""
+    if not keys:
+        return {}
+    try:
+        placeholders = ', '.join(['%s'] * len(keys))
+        query = f"SELECT * FROM weather_locations WHERE location_key IN ({placeholders})"
+        with connection.cursor() as cursor:
+            cursor.execute(query, list(keys))
+            return {row['location_key']: row for row in cursor.fetchall()}
+    except pymysql.err.MySQLError as e:
+        print(f"[ERROR] Location cache lookup failed: {e}")
+        return {}
+
+
+def _resolve_quietly(city, state):
+    """resolve_location() for worker threads: request/parse errors become None."""
+    try:
+        return resolve_location(city, state)
+    except (requests.exceptions.RequestException, KeyError, ValueError, IndexError, TypeError) as e:
+        print(f"[ERROR] Could not resolve {city}: {e}")
+        return None
+
+
+def _forecast_quietly(forecast_url, city):
+    """fetch_forecast_temperature() for worker threads: errors become (None, None)."""
+    try:
+        return fetch_forecast_temperature(forecast_url, city)
+    except (requests.exceptions.RequestException, KeyError, ValueError, IndexError, TypeError) as e:
+        print(f"[ERROR] Could not fetch forecast for {city}: {e}")
+        return None, None
+
+
+def _resolve_locations(connection, pool, places, keys):
+    """
+    Geocode + grid-resolve keys concurrently (Nominatim's limiter paces them)
+    and cache the results. places maps key -> (city, state).
+    Returns a dict of key -> location for the keys that resolved.
+    """
+    futures = {key: pool.submit(_resolve_quietly, *places[key]) for key in keys}
+    resolved = {}
+    for key, future in futures.items():
+        location = future.result()
+        if location is not None:
+            store_location(connection, key, location)
+            resolved[key] = location
+    return resolved
+
+
+def _fetch_forecasts(pool, locations, places):
+    """
+    Fetch each distinct forecast URL once (cities sharing an NWS grid share
+    the request). Returns (temperature by key, keys whose grid went stale).
+    """
+    by_url = {}
+    for key, location in locations.items():
+        by_url.setdefault(location['forecast_url'], []).append(key)
+
+    futures = {url: pool.submit(_forecast_quietly, url, places[keys[0]][0]) for url, keys in by_url.items()}
+    temperatures = {}
+    stale = []
+    for url, future in futures.items():
+        temperature, status = future.result()
+        for key in by_url[url]:
+            if status in (301, 404):
+                stale.append(key)
+            elif temperature is not None:
+                temperatures[key] = temperature
+    return temperatures, stale
+
+
+def refresh_all_weather(connection):
+    """
+    Refresh the temperature of every weather record.
+    Locations come from the weather_locations cache (missing ones are
+    resolved concurrently), each distinct NWS grid is fetched once on a
+    thread pool, and all temperatures are written with one executemany UPDATE.
+    Returns a report dict: updated (weather_id -> temperature), failed
+    (city names), elapsed (seconds).
+    """
+    started = time.perf_counter()
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT weather_id, city, state FROM weather ORDER BY city")
+        records = cursor.fetchall()
+
+    places = {}
+    for record in records:
+        places.setdefault(location_key(record['city'], record['state']), (record['city'], record['state']))
+
+    locations = lookup_locations(connection, list(places))
+
+    with ThreadPoolExecutor(max_workers=WEATHER_REFRESH_WORKERS) as pool:
+        missing = [key for key in places if key not in locations]
+        locations.update(_resolve_locations(connection, pool, places, missing))
+
+        temperatures, stale = _fetch_forecasts(pool, locations, places)
+
+        # Grids that moved since they were cached: forget, re-resolve, fetch once more
+        if stale:
+            for key in stale:
+                invalidate_location(connection, key)
+            retried = _resolve_locations(connection, pool, places, stale)
+            retry_temperatures, _ = _fetch_forecasts(pool, retried, places)
+            temperatures.update(retry_temperatures)
+
+    updated = {}
+    failed = []
+    for record in records:
+        temperature = temperatures.get(location_key(record['city'], record['state']))
+        if temperature is None:
+            failed.append(f"{record['city']}, {record['state']}" if record['state'] else record['city'])
+        else:
+            updated[record['weather_id']] = temperature
+
+    if updated:
+        update_query = """
+        UPDATE weather
+        SET temperature = %s
+        WHERE weather_id = %s
+        """
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany(update_query, [(temp, weather_id) for weather_id, temp in updated.items()])
+            connection.commit()
+            invalidate_table_pages('weather')
+        except Exception:
+            connection.rollback()
+            raise
+
+    return {
+        'updated': updated,
+        'failed': failed,
+        'elapsed': time.perf_counter() - started
+    }
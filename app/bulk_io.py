@@ -0,0 +1,212 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from .db_connect import stream_rows
+from .functions import invalidate_table_pages
+
+# Bulk import/export settings (optional environment variables)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))    # rows per executemany + commit
+MAX_REPORTED_ERRORS = 20
+
+FORMATS = ('csv', 'jsonl')
+
+# Tables that can be imported/exported. columns are the importable fields;
+# exports add the key and timestamps. upsert lists the columns overwritten
+# when a row collides with a unique key (tickers.symbol).
+TRANSFER_TABLES = {
+    'movies': {
+        'key': 'movie_id',
+        'columns': ['title', 'director', 'year', 'plot', 'poster', 'actors', 'genre'],
+        'required': ['title'],
+        'types': {'year': int},
+        'defaults': {},
+        'upsert': [],
+    },
+    'tickers': {
+        'key': 'ticker_id',
+        'columns': ['symbol', 'name', 'price'],
+        'required': ['symbol', 'name'],
+        'types': {'symbol': lambda value: str(value).upper(), 'price': float},
+        'defaults': {'price': 0.0},
+        'upsert': ['name', 'price'],
+    },
+    'weather': {
+        'key': 'weather_id',
+        'columns': ['city', 'state', 'temperature'],
+        'required': ['city'],
+        'types': {'temperature': float},
+        'defaults': {'temperature': 75.0},
+        'upsert': [],
+    },
+}
+
+
+def detect_format(filename, requested=None):
+    """Return 'csv' or 'jsonl' from an explicit format or the file extension, else None."""
+    if requested:
+        return requested if requested in FORMATS else None
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in ('json', 'ndjson'):
+        extension = 'jsonl'
+    return extension if extension in FORMATS else None
+
+
+def read_records(stream, fmt):
+    """
+    Yield (line number, dict) pairs from a text stream of CSV (with a header
+    row) or JSON Lines, one record at a time. Unparseable JSON lines yield
+    (line number, None).
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def _clean_record(spec, record):
+    """Return the row tuple for spec's columns, or raise ValueError with the reason."""
+    values = []
+    for column in spec['columns']:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ('', None):
+            if column in spec['required']:
+                raise ValueError(f"missing {column}")
+            values.append(spec['defaults'].get(column))
+            continue
+        convert = spec['types'].get(column)
+        try:
+            values.append(convert(value) if convert else value)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {column}: {value!r}")
+    return tuple(values)
+
+
+def _insert_query(table, spec):
+    """Multi-row friendly INSERT (pymysql batches executemany INSERT ... VALUES)."""
+    columns = spec['columns']
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    if spec['upsert']:
+        query += " ON DUPLICATE KEY UPDATE " + ', '.join(f"{column} = VALUES({column})" for column in spec['upsert'])
+    return query
+
+
+def import_records(connection, table, records, batch_size=None, progress=None):
+    """
+    Insert (line number, dict) records into table in batches: each batch is
+    one executemany (sent as multi-row INSERTs) and one commit, so memory
+    stays flat for any file size. Invalid rows are skipped and reported.
+    progress, if given, is called with the report after each batch.
+    Returns a report dict: imported, rejected (count), errors (first few
+    "line N: reason" strings), elapsed (seconds), rate (rows/sec) and error
+    (None, or why the import stopped early; earlier batches stay committed).
+    """
+    spec = TRANSFER_TABLES[table]
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    query = _insert_query(table, spec)
+    started = time.perf_counter()
+    report = {'imported': 0, 'rejected': 0, 'errors': [], 'elapsed': 0.0, 'rate': 0.0, 'error': None}
+
+    def flush(rows):
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany(query, rows)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        invalidate_table_pages(table)
+        report['imported'] += len(rows)
+        report['elapsed'] = time.perf_counter() - started
+        report['rate'] = report['imported'] / report['elapsed'] if report['elapsed'] else 0.0
+        if progress:
+            progress(report)
+
+    batch = []
+    line_number = 0
+    try:
+        for line_number, record in records:
+            try:
+                if record is None:
+                    raise ValueError("not a JSON object")
+                batch.append(_clean_record(spec, record))
+            except ValueError as e:
+                report['rejected'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append(f"line {line_number}: {e}")
+                continue
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except UnicodeDecodeError:
+        report['error'] = f"File is not UTF-8 encoded (after line {line_number})"
+    except Exception as e:
+        report['error'] = f"Import stopped near line {line_number}: {e}"
+
+    report['elapsed'] = time.perf_counter() - started
+    report['rate'] = report['imported'] / report['elapsed'] if report['elapsed'] else 0.0
+    return report
+
+
+def export_columns(table):
+    """Columns written by an export: key, importable columns, timestamps."""
+    spec = TRANSFER_TABLES[table]
+    return [spec['key']] + spec['columns'] + ['created_at', 'updated_at']
+
+
+def _export_value(value, fmt):
+    """Format a database value for CSV or JSON output."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value) if fmt == 'csv' else float(value)
+    return value
+
+
+def export_rows(connection, table, fmt):
+    """
+    Yield the table as CSV or JSON Lines text chunks, one row at a time.
+    Rows are read through stream_rows (an unbuffered server-side cursor),
+    so the table is never held in memory. The caller must exhaust the
+    generator (or close it) before reusing the connection.
+    """
+    columns = export_columns(table)
+    rows = stream_rows(connection, f"SELECT {', '.join(columns)} FROM {table} ORDER BY {TRANSFER_TABLES[table]['key']}",
+                       tuples=True)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    try:
+        if fmt == 'csv':
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        for row in rows:
+            if fmt == 'csv':
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow([_export_value(value, fmt) for value in row])
+                yield buffer.getvalue()
+            else:
+                yield json.dumps({column: _export_value(value, fmt) for column, value in zip(columns, row)}) + '\n'
+    finally:
+        # Drain the server-side cursor even when the download is abandoned
+        rows.close()
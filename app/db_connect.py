@@ -1,38 +1,392 @@
 import pymysql
 import pymysql.cursors
-from flask import g
+from flask import g, has_app_context
 import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_db():
-    if 'db' not in g or not is_connection_open(g.db):
-        print("Re-establishing closed database connection.")
-        try:
-            g.db = pymysql.connect(
-                # Database configuration from environment variables
-                host=os.getenv('DB_HOST'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD'),
-                database=os.getenv('DB_NAME'),
-                cursorclass=pymysql.cursors.DictCursor  # Set the default cursor class to DictCursor
-            )
-        except Exception as e:
-            print(f"Database connection failed: {e}")
-            g.db = None
-            return None
-    return g.db
+# Connection pool settings (all optional, read from environment variables)
+POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '0'))
+# One connection per gunicorn thread by default (the Procfile runs WEB_THREADS, default 32),
+# so DB routes never queue behind the pool while the worker has free threads
+POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', os.getenv('WEB_THREADS', '32')))
+POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))      # seconds an idle connection is kept
+POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '3600'))     # seconds before a connection is recycled
+POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '30'))           # idle seconds before checkout health check
+POOL_WAIT_TIMEOUT = float(os.getenv('DB_POOL_WAIT_TIMEOUT', '5'))        # seconds to wait for a free connection
+
+# Rows pulled from the server per round trip by stream_rows()
+STREAM_FETCH_SIZE = int(os.getenv('DB_STREAM_FETCH_SIZE', '1000'))
+
+# Compact rows: table columns are read from the schema file, and one namedtuple
+# class is built per (table, selected columns) on first use
+SCHEMA_PATH = os.getenv('DB_SCHEMA_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'schema.sql'))
+_row_types_lock = threading.Lock()
+_row_types = {'schema': None, 'classes': {}}
+
+# Pool state lives at module level so every request thread in a worker shares it.
+# Idle entries are dicts: {'conn': ..., 'created_at': ..., 'last_used': ...}
+_pool_lock = threading.Condition()
+_pool = {
+    'pid': os.getpid(),
+    'idle': deque(),
+    'in_use': {},      # id(conn) -> created_at
+    'reserved': 0,     # slots held by threads currently opening a connection
+    'stats': {
+        'checkouts': 0,
+        'returns': 0,
+        'creations': 0,
+        'creation_failures': 0,
+        'discards': 0,
+        'health_checks': 0,
+        'failed_health_checks': 0,
+        'waits': 0,
+        'wait_timeouts': 0,
+        'total_wait_seconds': 0.0,
+    },
+}
+
+
+# Per-endpoint database usage: endpoint -> {'requests', 'db_requests', 'round_trips'}
+_usage_lock = threading.Lock()
+_endpoint_usage = {}
+
+
+class _RoundTripCounter:
+    """Cursor mixin that counts every query sent to the server on the current request."""
+
+    def _query(self, q):
+        if has_app_context():
+            g.db_round_trips = g.get('db_round_trips', 0) + 1
+        return super()._query(q)
+
+
+class CountingDictCursor(_RoundTripCounter, pymysql.cursors.DictCursor):
+    """DictCursor that counts every query sent to the server on the current request."""
+
+
+class CountingCursor(_RoundTripCounter, pymysql.cursors.Cursor):
+    """Plain tuple cursor, used to build compact rows."""
+
+
+class CountingSSDictCursor(_RoundTripCounter, pymysql.cursors.SSDictCursor):
+    """Unbuffered DictCursor: rows are read from the socket as they are fetched."""
+
 
-def is_connection_open(conn):
+class CountingSSCursor(_RoundTripCounter, pymysql.cursors.SSCursor):
+    """Unbuffered tuple cursor, for large reads that don't need column names."""
+
+
+def stream_rows(connection, query, args=None, tuples=False, fetch_size=None):
+    """
+    Yield the rows of query one at a time from an unbuffered server-side
+    cursor, so a large result is never held in memory. Rows are dicts, or
+    tuples in SELECT order when tuples is True (no per-row key dicts).
+    The connection can run nothing else until the generator is exhausted
+    or closed; closing it early drains the unread rows.
+    """
+    cursor = connection.cursor(CountingSSCursor if tuples else CountingSSDictCursor)
     try:
-        conn.ping(reconnect=True)  # PyMySQL's way to check connection health
+        cursor.execute(query, args)
+        while True:
+            rows = cursor.fetchmany(fetch_size or STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def load_schema(path=None):
+    """
+    Parse the CREATE TABLE statements of the schema file into
+    {table: [column, ...]} in declaration order. Cached after the first call.
+    """
+    with _row_types_lock:
+        if _row_types['schema'] is not None and path is None:
+            return _row_types['schema']
+
+    with open(path or SCHEMA_PATH, encoding='utf-8') as f:
+        sql = re.sub(r"--[^\n]*", "", f.read())
+
+    schema = {}
+    for table, body in re.findall(r"CREATE TABLE (\w+)\s*\((.*?)\)\s*;", sql, re.S | re.I):
+        columns = []
+        for line in body.split('\n'):
+            words = line.strip().split()
+            if words and words[0].upper() not in ('PRIMARY', 'KEY', 'UNIQUE', 'INDEX', 'FULLTEXT', 'FOREIGN', 'CONSTRAINT'):
+                columns.append(words[0].strip('`'))
+        schema[table] = columns
+
+    if path is None:
+        with _row_types_lock:
+            _row_types['schema'] = schema
+    return schema
+
+
+def row_type(table, columns=None):
+    """
+    Return the namedtuple class for rows of table holding columns (all of the
+    table's schema columns by default), e.g. TickersRow. Rows take no per-row
+    key dict, and templates read them like dict rows (row.symbol).
+    Raises ValueError for a table or column missing from the schema.
+    """
+    schema = load_schema()
+    if table not in schema:
+        raise ValueError(f"Unknown table: {table}")
+    columns = tuple(columns or schema[table])
+    unknown = [column for column in columns if column not in schema[table]]
+    if unknown:
+        raise ValueError(f"Unknown {table} column(s): {', '.join(unknown)}")
+
+    with _row_types_lock:
+        cls = _row_types['classes'].get((table, columns))
+        if cls is None:
+            name = ''.join(part.title() for part in table.split('_')) + 'Row'
+            cls = _row_types['classes'][(table, columns)] = namedtuple(name, columns)
+        return cls
+
+
+def fetch_compact(connection, table, query, args=None):
+    """
+    Run query and return its rows as row_type(table, <selected columns>)
+    instances instead of dicts. Selected columns must be columns of table.
+    """
+    with connection.cursor(CountingCursor) as cursor:
+        cursor.execute(query, args)
+        make = row_type(table, [column[0] for column in cursor.description])._make
+        return [make(row) for row in cursor.fetchall()]
+
+
+def _create_connection():
+    """
+    Open a new raw PyMySQL connection from the environment settings.
+    Returns the connection or None when the database is unreachable.
+    """
+    try:
+        conn = pymysql.connect(
+            # Database configuration from environment variables
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME'),
+            cursorclass=CountingDictCursor  # DictCursor rows, plus per-request round-trip counting
+        )
+    except Exception as e:
+        print(f"Database connection failed: {e}")
+        with _pool_lock:
+            _pool['stats']['creation_failures'] += 1
+        return None
+
+    with _pool_lock:
+        _pool['stats']['creations'] += 1
+    return conn
+
+
+def _discard_connection(conn):
+    """Close a connection that is leaving the pool for good (errors are ignored)."""
+    with _pool_lock:
+        _pool['stats']['discards'] += 1
+    try:
+        if not conn._closed:
+            conn.close()
+    except Exception:
+        pass
+
+
+def _reset_after_fork():
+    """
+    Drop pool state inherited from a parent process (e.g. a gunicorn master).
+    Sockets must never be shared between processes. Caller holds the lock.
+    """
+    if _pool['pid'] != os.getpid():
+        _pool['pid'] = os.getpid()
+        _pool['idle'].clear()
+        _pool['in_use'].clear()
+        _pool['reserved'] = 0
+
+
+def _prune_idle(now):
+    """
+    Remove idle connections past the idle timeout or max lifetime, keeping
+    at least POOL_MIN_SIZE around. Caller holds the lock; returns the
+    connections that must be closed outside of it.
+    """
+    expired = []
+    kept = deque()
+    total = len(_pool['idle']) + len(_pool['in_use']) + _pool['reserved']
+    for entry in _pool['idle']:
+        too_old = now - entry['created_at'] > POOL_MAX_LIFETIME
+        too_idle = now - entry['last_used'] > POOL_IDLE_TIMEOUT and total > POOL_MIN_SIZE
+        if too_old or too_idle:
+            expired.append(entry['conn'])
+            total -= 1
+        else:
+            kept.append(entry)
+    _pool['idle'] = kept
+    return expired
+
+
+def _is_healthy(entry, now):
+    """
+    Health check a connection on checkout, but only if it sat idle long
+    enough that the server may have dropped it (wait_timeout, failover).
+    """
+    if now - entry['last_used'] < POOL_PING_AFTER:
         return True
-    except:
+    with _pool_lock:
+        _pool['stats']['health_checks'] += 1
+    try:
+        entry['conn'].ping(reconnect=False)
+        return True
+    except Exception:
+        with _pool_lock:
+            _pool['stats']['failed_health_checks'] += 1
         return False
 
+
+def acquire_connection():
+    """
+    Borrow a connection from the process-wide pool.
+    Reuses an idle connection when possible, opens a new one while under
+    POOL_MAX_SIZE, otherwise waits up to POOL_WAIT_TIMEOUT for a return.
+    Returns a connection or None (database unavailable or pool exhausted).
+    """
+    deadline = None
+    while True:
+        with _pool_lock:
+            _reset_after_fork()
+            now = time.monotonic()
+            expired = _prune_idle(now)
+            entry = _pool['idle'].pop() if _pool['idle'] else None
+            busy = len(_pool['in_use']) + _pool['reserved']
+            can_create = entry is None and busy < POOL_MAX_SIZE
+            if entry is None and not can_create:
+                if deadline is None:
+                    deadline = now + POOL_WAIT_TIMEOUT
+                    _pool['stats']['waits'] += 1
+                remaining = deadline - now
+                if remaining <= 0:
+                    _pool['stats']['wait_timeouts'] += 1
+                    print("Database connection pool exhausted; giving up waiting.")
+                    return None
+                started = time.monotonic()
+                _pool_lock.wait(remaining)
+                _pool['stats']['total_wait_seconds'] += time.monotonic() - started
+            elif can_create:
+                # Reserve the slot before connecting outside the lock
+                _pool['reserved'] += 1
+
+        for conn in expired:
+            _discard_connection(conn)
+
+        if entry is not None:
+            if _is_healthy(entry, time.monotonic()):
+                with _pool_lock:
+                    _pool['in_use'][id(entry['conn'])] = entry['created_at']
+                    _pool['stats']['checkouts'] += 1
+                return entry['conn']
+            _discard_connection(entry['conn'])
+            continue
+
+        if can_create:
+            conn = _create_connection()
+            with _pool_lock:
+                _pool['reserved'] -= 1
+                if conn is None:
+                    _pool_lock.notify()
+                    return None
+                _pool['in_use'][id(conn)] = time.monotonic()
+                _pool['stats']['checkouts'] += 1
+            return conn
+
+
+def release_connection(conn):
+    """
+    Return a borrowed connection to the pool.
+    Any open transaction is rolled back so the next borrower starts clean;
+    broken or expired connections are closed instead of being pooled.
+    """
+    if conn is None:
+        return
+
+    with _pool_lock:
+        created_at = _pool['in_use'].pop(id(conn), None)
+
+    reusable = created_at is not None and not conn._closed
+    if reusable:
+        try:
+            conn.rollback()
+        except Exception:
+            reusable = False
+
+    now = time.monotonic()
+    if reusable and now - created_at > POOL_MAX_LIFETIME:
+        reusable = False
+
+    if not reusable:
+        _discard_connection(conn)
+        with _pool_lock:
+            _pool_lock.notify()
+        return
+
+    with _pool_lock:
+        _pool['idle'].append({'conn': conn, 'created_at': created_at, 'last_used': now})
+        _pool['stats']['returns'] += 1
+        _pool_lock.notify()
+
+
+def get_pool_stats():
+    """Return a snapshot of pool sizes, settings and counters for monitoring."""
+    with _pool_lock:
+        stats = dict(_pool['stats'])
+        stats['idle'] = len(_pool['idle'])
+        stats['in_use'] = len(_pool['in_use'])
+    stats['min_size'] = POOL_MIN_SIZE
+    stats['max_size'] = POOL_MAX_SIZE
+    stats['idle_timeout'] = POOL_IDLE_TIMEOUT
+    stats['max_lifetime'] = POOL_MAX_LIFETIME
+    return stats
+
+
+def get_db():
+    """
+    Return this request's database connection, borrowing one from the pool
+    on first use. Requests that never call get_db() never touch MySQL.
+    """
+    if g.get('db') is None:
+        g.db = acquire_connection()
+    return g.db
+
+
 def close_db(exception=None):
+    """Return the connection to the pool, but only if this request acquired one."""
     db = g.pop('db', None)
-    if db is not None and not db._closed:
-        print("Closing database connection.")
-        db.close()
\ No newline at end of file
+    if db is not None:
+        release_connection(db)
+
+
+def record_db_usage(endpoint):
+    """
+    Fold the current request's round-trip count into the per-endpoint totals
+    so /metrics/db shows which routes actually need the database.
+    """
+    round_trips = g.get('db_round_trips', 0)
+    with _usage_lock:
+        usage = _endpoint_usage.setdefault(endpoint or 'unknown', {'requests': 0, 'db_requests': 0, 'round_trips': 0})
+        usage['requests'] += 1
+        usage['round_trips'] += round_trips
+        if round_trips:
+            usage['db_requests'] += 1
+
+
+def get_db_usage():
+    """Return a copy of the per-endpoint database usage totals."""
+    with _usage_lock:
+        return {endpoint: dict(usage) for endpoint, usage in _endpoint_usage.items()}
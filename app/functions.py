@@ -1 +1,497 @@
 # Function will go in here for the entire site to use
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from .db_connect import fetch_compact
+
+
+# ---------------------------------------------------------------------------
+# In-process TTL + LRU cache
+#
+# A cache is a plain dict built by make_cache() and passed to the helpers
+# below. Entries are fresh until their TTL runs out, then "stale" for
+# stale_ttl more seconds (callers may serve them while refreshing), then gone.
+# ---------------------------------------------------------------------------
+
+def make_cache(max_entries=1000, ttl=60.0, stale_ttl=0.0):
+    """Create an empty cache holding at most max_entries items."""
+    return {
+        'entries': OrderedDict(),   # key -> (value, expires_at)
+        'lock': threading.Lock(),
+        'max_entries': max_entries,
+        'ttl': ttl,
+        'stale_ttl': stale_ttl,
+        'stats': {'hits': 0, 'stale_hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0},
+    }
+
+
+def cache_get(cache, key):
+    """
+    Look up key. Returns (value, state) where state is 'fresh', 'stale' or
+    'miss' (value is None on a miss). Hits move the key to the LRU front.
+    """
+    now = time.time()
+    with cache['lock']:
+        entry = cache['entries'].get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if now <= expires_at:
+                cache['entries'].move_to_end(key)
+                cache['stats']['hits'] += 1
+                return value, 'fresh'
+            if now <= expires_at + cache['stale_ttl']:
+                cache['entries'].move_to_end(key)
+                cache['stats']['stale_hits'] += 1
+                return value, 'stale'
+            del cache['entries'][key]
+        cache['stats']['misses'] += 1
+        return None, 'miss'
+
+
+def cache_set(cache, key, value, ttl=None, stored_at=None):
+    """
+    Store value under key. ttl overrides the cache default for this entry;
+    stored_at backdates the entry (e.g. when copied from a shared store).
+    Evicts least recently used entries beyond max_entries.
+    """
+    ttl = cache['ttl'] if ttl is None else ttl
+    stored_at = time.time() if stored_at is None else stored_at
+    with cache['lock']:
+        cache['entries'][key] = (value, stored_at + ttl)
+        cache['entries'].move_to_end(key)
+        cache['stats']['sets'] += 1
+        while len(cache['entries']) > cache['max_entries']:
+            cache['entries'].popitem(last=False)
+            cache['stats']['evictions'] += 1
+
+
+def cache_delete(cache, key):
+    """Remove key from the cache if present."""
+    with cache['lock']:
+        cache['entries'].pop(key, None)
+
+
+def cache_delete_matching(cache, predicate):
+    """Remove every key for which predicate(key) is true. Returns how many were removed."""
+    with cache['lock']:
+        keys = [key for key in cache['entries'] if predicate(key)]
+        for key in keys:
+            del cache['entries'][key]
+    return len(keys)
+
+
+def cache_clear(cache):
+    """Remove every entry (counters are kept)."""
+    with cache['lock']:
+        cache['entries'].clear()
+
+
+def cache_stats(cache):
+    """Return counters, current size and hit ratio for monitoring."""
+    with cache['lock']:
+        stats = dict(cache['stats'])
+        stats['size'] = len(cache['entries'])
+    stats['max_entries'] = cache['max_entries']
+    lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+    stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Shared key/value store (SQLite file)
+#
+# Lets several gunicorn workers on one machine share cached values. Values
+# are JSON encoded; callers decide freshness from the returned stored_at.
+# ---------------------------------------------------------------------------
+
+_sqlite_local = threading.local()
+
+
+def _shared_store(path):
+    """Return this thread's SQLite connection for path, creating the table on first use."""
+    connections = getattr(_sqlite_local, 'connections', None)
+    if connections is None:
+        connections = _sqlite_local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS shared_cache (
+                namespace TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (namespace, cache_key)
+            )
+        """)
+        conn.commit()
+        connections[path] = conn
+    return conn
+
+
+def shared_store_get(path, namespace, key):
+    """Return (value, stored_at) for key, or (None, None) if absent or unreadable."""
+    try:
+        row = _shared_store(path).execute(
+            "SELECT value, stored_at FROM shared_cache WHERE namespace = ? AND cache_key = ?",
+            (namespace, key)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Shared cache read failed ({namespace}): {e}")
+        return None, None
+    if row is None:
+        return None, None
+    return json.loads(row[0]), row[1]
+
+
+def shared_store_set(path, namespace, key, value, stored_at=None):
+    """Insert or replace key with a JSON-serialisable value. Errors are logged, not raised."""
+    stored_at = time.time() if stored_at is None else stored_at
+    try:
+        conn = _shared_store(path)
+        conn.execute(
+            "INSERT OR REPLACE INTO shared_cache (namespace, cache_key, value, stored_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), stored_at)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Shared cache write failed ({namespace}): {e}")
+
+
+def shared_store_delete(path, namespace, key):
+    """Remove key from the shared store. Errors are logged, not raised."""
+    try:
+        conn = _shared_store(path)
+        conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND cache_key = ?", (namespace, key))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Shared cache delete failed ({namespace}): {e}")
+
+
+def shared_store_clear(path, namespace):
+    """Remove every key of namespace from the shared store. Errors are logged, not raised."""
+    try:
+        conn = _shared_store(path)
+        conn.execute("DELETE FROM shared_cache WHERE namespace = ?", (namespace,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Shared cache clear failed ({namespace}): {e}")
+
+
+def shared_store_prune(path, namespace, older_than, max_entries=None):
+    """
+    Remove keys of namespace stored before older_than (a time.time() value)
+    and, if max_entries is given, all but the newest max_entries keys.
+    Errors are logged, not raised.
+    """
+    try:
+        conn = _shared_store(path)
+        conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND stored_at < ?", (namespace, older_than))
+        if max_entries is not None:
+            conn.execute("""
+                DELETE FROM shared_cache WHERE namespace = ? AND cache_key NOT IN (
+                    SELECT cache_key FROM shared_cache WHERE namespace = ? ORDER BY stored_at DESC LIMIT ?
+                )
+            """, (namespace, namespace, max_entries))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[ERROR] Shared cache prune failed ({namespace}): {e}")
+
+
+# ---------------------------------------------------------------------------
+# Token bucket rate limiter
+#
+# rate tokens are added per second up to burst; acquire_token() blocks the
+# calling thread until a token is available. Safe to share across threads.
+# ---------------------------------------------------------------------------
+
+def make_rate_limiter(rate, burst=1):
+    """Create a limiter allowing `rate` calls per second with bursts of `burst`."""
+    return {
+        'rate': float(rate),
+        'burst': float(burst),
+        'tokens': float(burst),
+        'updated': time.monotonic(),
+        'lock': threading.Lock(),
+        'stats': {'acquired': 0, 'waits': 0, 'waited_seconds': 0.0},
+    }
+
+
+def acquire_token(limiter):
+    """Block until a token is available, then take it. Returns seconds waited."""
+    waited = 0.0
+    while True:
+        with limiter['lock']:
+            now = time.monotonic()
+            elapsed = now - limiter['updated']
+            limiter['tokens'] = min(limiter['burst'], limiter['tokens'] + elapsed * limiter['rate'])
+            limiter['updated'] = now
+            if limiter['tokens'] >= 1.0:
+                limiter['tokens'] -= 1.0
+                limiter['stats']['acquired'] += 1
+                if waited:
+                    limiter['stats']['waits'] += 1
+                    limiter['stats']['waited_seconds'] += waited
+                return waited
+            delay = (1.0 - limiter['tokens']) / limiter['rate']
+        time.sleep(delay)
+        waited += delay
+
+
+def rate_limiter_stats(limiter):
+    """Return a copy of the limiter's counters and settings."""
+    with limiter['lock']:
+        stats = dict(limiter['stats'])
+    stats['rate'] = limiter['rate']
+    stats['burst'] = limiter['burst']
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Latency summaries
+# ---------------------------------------------------------------------------
+
+def percentile(samples, fraction):
+    """Return the nearest-rank percentile (fraction in 0..1) of samples, or None if empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(samples):
+    """Summarize a sequence of durations (seconds) as count, avg, p50, p95 and max."""
+    samples = list(samples)
+    if not samples:
+        return {'count': 0, 'avg': None, 'p50': None, 'p95': None, 'max': None}
+    return {
+        'count': len(samples),
+        'avg': round(sum(samples) / len(samples), 4),
+        'p50': round(percentile(samples, 0.50), 4),
+        'p95': round(percentile(samples, 0.95), 4),
+        'max': round(max(samples), 4),
+    }
+
+
+# ---------------------------------------------------------------------------
+# DataTables server-side processing
+#
+# A table spec is the row schema of one list view, shared by the query and
+# the template (which builds its DataTable columns from it):
+#   {'table': 'movies', 'key': 'movie_id',
+#    'columns': [...],        # the only columns selected, in the order the DataTable shows them
+#    'orderable': [...],      # columns with an index to sort on
+#    'nullable': [...],       # orderable columns that may hold NULL
+#    'searchable': [...],     # columns matched by prefix (index-friendly LIKE 'x%')
+#    'default_order': 'title'}
+# Paging forward one page at a time continues from the last row of the
+# previous page (keyset) instead of counting past OFFSET rows; random jumps
+# fall back to OFFSET.
+# ---------------------------------------------------------------------------
+
+DATATABLES_MAX_LENGTH = int(os.getenv('DATATABLES_MAX_LENGTH', '500'))
+_page_bookmarks = make_cache(max_entries=2000, ttl=float(os.getenv('DATATABLES_BOOKMARK_TTL', '300')))
+
+
+def escape_like(text):
+    """Escape LIKE wildcards so user input only matches literally."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def select_columns(spec):
+    """Return the SELECT list for a table spec: its key plus its list columns."""
+    columns = [spec['key']] + [column for column in spec['columns'] if column != spec['key']]
+    return ', '.join(columns)
+
+
+def _datatables_value(value):
+    """Make a database value JSON friendly for the DataTables response."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def datatables_page(connection, spec, args):
+    """
+    Answer one DataTables server-side request (draw, start, length,
+    search[value], order[0][column], order[0][dir] in args) for spec.
+    Returns the response dict: draw, recordsTotal, recordsFiltered, data.
+    Each data row is an array in select_columns() order (the key, then the
+    list columns), so the client addresses columns by index.
+    """
+    table, key, columns = spec['table'], spec['key'], spec['columns']
+
+    draw = args.get('draw', type=int, default=0)
+    start = max(args.get('start', type=int, default=0), 0)
+    length = args.get('length', type=int, default=25)
+    if length <= 0 or length > DATATABLES_MAX_LENGTH:
+        length = DATATABLES_MAX_LENGTH
+    search = args.get('search[value]', '').strip()
+
+    column_index = args.get('order[0][column]', type=int, default=-1)
+    sort = columns[column_index] if 0 <= column_index < len(columns) else None
+    if sort not in spec['orderable']:
+        sort = spec['default_order']
+    descending = args.get('order[0][dir]') == 'desc'
+    direction = 'DESC' if descending else 'ASC'
+
+    where, params = [], []
+    if search:
+        where.append('(' + ' OR '.join(f"{column} LIKE %s" for column in spec['searchable']) + ')')
+        params.extend([escape_like(search) + '%'] * len(spec['searchable']))
+    filter_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    filter_params = list(params)
+
+    # Continue from the previous page's last row when we saw it. Bookmarks are
+    # keyed by the table version, so none survive a write in any worker.
+    offset = start
+    version = table_version(table)
+    bookmark_key = (table, version, sort, direction, search, start)
+    bookmark, _ = cache_get(_page_bookmarks, bookmark_key) if start else (None, 'miss')
+    if bookmark is not None and bookmark[0] is not None:
+        after_value, after_key = bookmark
+        op = '<' if descending else '>'
+        condition = f"({sort} {op} %s OR ({sort} = %s AND {key} {op} %s))"
+        if descending and sort in spec.get('nullable', ()):
+            condition = f"({condition} OR {sort} IS NULL)"
+        where.append(condition)
+        params.extend([after_value, after_value, after_key])
+        offset = 0
+    page_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    order_sql = f"{sort} {direction}" if sort == key else f"{sort} {direction}, {key} {direction}"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS total FROM {table}")
+        total = cursor.fetchone()['total']
+        filtered = total
+        if search:
+            cursor.execute(f"SELECT COUNT(*) AS total FROM {table}{filter_sql}", filter_params)
+            filtered = cursor.fetchone()['total']
+
+    rows = fetch_compact(
+        connection, table,
+        f"SELECT {select_columns(spec)} FROM {table}{page_sql} ORDER BY {order_sql} LIMIT %s OFFSET %s",
+        params + [length, offset]
+    )
+
+    if len(rows) == length:
+        last = rows[-1]
+        cache_set(_page_bookmarks, (table, version, sort, direction, search, start + length),
+                  (getattr(last, sort), getattr(last, key)))
+
+    return {
+        'draw': draw,
+        'recordsTotal': total,
+        'recordsFiltered': filtered,
+        'data': [list(map(_datatables_value, row)) for row in rows],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Page cache for the DataTables list endpoints
+#
+# /X/data pages are cached per table under the table's current version.
+# Every committed write to a table calls invalidate_table_pages(), which
+# moves the version on (pages built from older data are never served again)
+# and drops the table's stored pages. Versions and pages live in a SQLite
+# file shared by all gunicorn workers, fronted by an in-process cache.
+# ---------------------------------------------------------------------------
+
+PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'page_cache.sqlite3')
+PAGE_CACHE_TTL = float(os.getenv('PAGE_CACHE_TTL', '3600'))    # seconds; bounds staleness from writes made outside the app
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '500'))
+PAGE_CACHE_IGNORED_ARGS = ('draw', '_')    # DataTables request counter, jQuery cache buster
+
+_page_cache = make_cache(PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_TTL)
+_page_cache_lock = threading.Lock()
+_page_cache_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _count_page_cache(name):
+    with _page_cache_lock:
+        _page_cache_stats[name] += 1
+
+
+def table_version(table):
+    """Return the table's current page cache version (0 before its first write)."""
+    version, _ = shared_store_get(PAGE_CACHE_PATH, 'table_versions', table)
+    return version or 0
+
+
+def invalidate_table_pages(table):
+    """
+    Call after committing a write to table so its cached pages are no longer
+    served and no page is rebuilt from a keyset bookmark taken before the
+    write. The new version is a nanosecond timestamp rather than a +1, so
+    workers bumping at the same moment never need a read-modify-write.
+    """
+    shared_store_set(PAGE_CACHE_PATH, 'table_versions', table, time.time_ns())
+    shared_store_clear(PAGE_CACHE_PATH, f"pages:{table}")
+    cache_delete_matching(_page_bookmarks, lambda key: key[0] == table)
+    _count_page_cache('invalidations')
+
+
+def get_cached_page(table, args):
+    """
+    Look up the cached DataTables page for table and the request args.
+    Returns (key, page), page being None on a miss; pass the key to
+    store_cached_page() once the page has been built.
+    """
+    params = sorted((name, value) for name, value in args.items(multi=True) if name not in PAGE_CACHE_IGNORED_ARGS)
+    key = f"{table_version(table)}:{hashlib.sha1(json.dumps(params).encode()).hexdigest()}"
+
+    page, state = cache_get(_page_cache, (table, key))
+    if state == 'fresh':
+        _count_page_cache('hits')
+        return key, page
+
+    page, stored_at = shared_store_get(PAGE_CACHE_PATH, f"pages:{table}", key)
+    if page is not None and time.time() - stored_at < PAGE_CACHE_TTL:
+        cache_set(_page_cache, (table, key), page, stored_at=stored_at)
+        _count_page_cache('shared_hits')
+        return key, page
+
+    _count_page_cache('misses')
+    return key, None
+
+
+def store_cached_page(table, key, page):
+    """
+    Cache a built DataTables page under the key from get_cached_page().
+    Expired pages, and all but the newest PAGE_CACHE_MAX_ENTRIES, are
+    removed from the table's shared namespace as it goes, so a read-mostly
+    table doesn't collect every search prefix until its next write.
+    """
+    cache_set(_page_cache, (table, key), page)
+    shared_store_set(PAGE_CACHE_PATH, f"pages:{table}", key, page)
+    shared_store_prune(PAGE_CACHE_PATH, f"pages:{table}", time.time() - PAGE_CACHE_TTL, PAGE_CACHE_MAX_ENTRIES)
+
+
+def get_page_cache_stats():
+    """Return page cache hits (local and shared), misses, invalidations and hit ratio."""
+    with _page_cache_lock:
+        stats = dict(_page_cache_stats)
+    lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_ratio'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+    stats['local_size'] = cache_stats(_page_cache)['size']
+    stats['ttl'] = PAGE_CACHE_TTL
+    return stats
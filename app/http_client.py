@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Outbound HTTP settings shared by every blueprint (all optional environment variables)
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))                  # seconds per request
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))             # retries on 429/5xx/connection errors
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))                 # exponential backoff factor (seconds)
+HTTP_BACKOFF_JITTER = float(os.getenv('HTTP_BACKOFF_JITTER', '0.5'))   # random seconds added to each backoff
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))                # keep-alive connections per host
+HTTP_HOST_CONCURRENCY = int(os.getenv('HTTP_HOST_CONCURRENCY', '8'))   # in-flight requests per host
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_sessions = {}      # host -> requests.Session
+_host_slots = {}    # host -> BoundedSemaphore capping in-flight requests
+_upstreams = {}     # host -> latency/count stats
+_host_limits = {}   # host -> in-flight cap replacing HTTP_HOST_CONCURRENCY
+_httpx_client = {'client': None}
+
+
+def _retry_policy():
+    """Bounded retries with jittered exponential backoff that honour Retry-After."""
+    return Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+
+
+def get_session(host):
+    """
+    Return the pooled requests.Session for host, creating it on first use.
+    Sessions keep connections alive and retry 429/5xx responses.
+    """
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=_retry_policy())
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[host] = session
+        return session
+
+
+def set_host_concurrency(host, limit):
+    """
+    Give host its own in-flight cap instead of HTTP_HOST_CONCURRENCY, e.g. an
+    SDK upstream whose callers already enforce their own concurrency limit.
+    Call at import time, before the host's first request.
+    """
+    with _lock:
+        _host_limits[host] = limit
+        if host in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(limit)
+
+
+def get_httpx_client():
+    """
+    Return the process-wide httpx.Client for SDKs built on httpx (Groq).
+    Connections are pooled and kept alive across calls; the pool is large
+    enough for the biggest per-host cap set with set_host_concurrency().
+    """
+    with _lock:
+        if _httpx_client['client'] is None:
+            pool_size = max([HTTP_POOL_SIZE] + list(_host_limits.values()))
+            _httpx_client['client'] = httpx.Client(
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size
+                )
+            )
+        return _httpx_client['client']
+
+
+def _upstream(host):
+    """Return (creating if needed) the concurrency slot and stats for host. Caller holds the lock."""
+    if host not in _upstreams:
+        _host_slots[host] = threading.BoundedSemaphore(_host_limits.get(host, HTTP_HOST_CONCURRENCY))
+        _upstreams[host] = {
+            'requests': 0,
+            'errors': 0,
+            'in_flight': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0,
+            'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+        }
+    return _host_slots[host], _upstreams[host]
+
+
+def _record_latency(stats, seconds, failed):
+    """Add one call to an upstream's counters and latency histogram. Caller holds the lock."""
+    stats['requests'] += 1
+    stats['total_seconds'] += seconds
+    stats['max_seconds'] = max(stats['max_seconds'], seconds)
+    if failed:
+        stats['errors'] += 1
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            stats['buckets'][index] += 1
+            break
+    else:
+        stats['buckets'][-1] += 1
+
+
+@contextmanager
+def upstream_call(host):
+    """
+    Wrap one call to an upstream service: waits for a free per-host slot
+    (at most HTTP_HOST_CONCURRENCY, or the host's own cap, in flight), then
+    records its latency.
+    Use directly for SDKs that do their own HTTP (yfinance, Groq).
+    """
+    with _lock:
+        slot, stats = _upstream(host)
+    slot.acquire()
+    with _lock:
+        stats['in_flight'] += 1
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            stats['in_flight'] -= 1
+            _record_latency(stats, elapsed, failed)
+        slot.release()
+
+
+def http_get(url, **kwargs):
+    """
+    GET url through the host's pooled session with retries, the per-host
+    concurrency cap and latency tracking. Accepts requests.get keyword
+    arguments; timeout defaults to HTTP_TIMEOUT. Raises requests exceptions.
+    """
+    host = urlsplit(url).hostname
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    with upstream_call(host):
+        response = get_session(host).get(url, **kwargs)
+    if response.status_code in RETRY_STATUSES:
+        with _lock:
+            _upstreams[host]['errors'] += 1
+    return response
+
+
+class _PinnedAdapter(HTTPAdapter):
+    """Adapter whose TLS handshake (SNI and certificate check) uses hostname, whatever address the URL names."""
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+        super().__init__(max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['server_hostname'] = self.hostname
+        kwargs['assert_hostname'] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+def http_get_at(url, address, **kwargs):
+    """
+    GET url by connecting to address (an IP the caller has already vetted)
+    instead of resolving the URL's host again, so the connection cannot
+    land somewhere else. Host header, SNI and the certificate check still
+    use the URL's host name. No retries or proxies; timeout defaults to
+    HTTP_TIMEOUT. Raises requests exceptions.
+    """
+    parts = urlsplit(url)
+    host = f"[{parts.hostname}]" if ':' in parts.hostname else parts.hostname
+    target = f"[{address}]" if ':' in address else address
+    if parts.port:
+        host, target = f"{host}:{parts.port}", f"{target}:{parts.port}"
+
+    session = requests.Session()
+    session.trust_env = False
+    session.mount(f"{parts.scheme}://", _PinnedAdapter(parts.hostname))
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    headers = dict(kwargs.pop('headers', None) or {}, Host=host)
+    with upstream_call(parts.hostname):
+        response = session.get(urlunsplit(parts._replace(netloc=target)), headers=headers, **kwargs)
+    if response.status_code in RETRY_STATUSES:
+        with _lock:
+            _upstreams[parts.hostname]['errors'] += 1
+    return response
+
+
+def get_http_stats():
+    """Return per-upstream request counts, errors and latency histograms."""
+    labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+    report = {}
+    with _lock:
+        for host, stats in _upstreams.items():
+            report[host] = {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'in_flight': stats['in_flight'],
+                'avg_seconds': round(stats['total_seconds'] / stats['requests'], 4) if stats['requests'] else 0.0,
+                'max_seconds': round(stats['max_seconds'], 4),
+                'latency_histogram': [[label, count] for label, count in zip(labels, stats['buckets'])],
+            }
+    return report
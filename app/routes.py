@@ -1,5 +1,13 @@
-from flask import render_template
+import io
+
+from flask import render_template, jsonify, request, Response, stream_with_context
 from . import app
+from .db_connect import get_pool_stats, get_db_usage, get_db, acquire_connection, release_connection
+from .http_client import get_http_stats
+from .functions import get_page_cache_stats
+from .bulk_io import TRANSFER_TABLES, detect_format, read_records, import_records, export_rows
+
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
 
 @app.route('/')
 def index():
@@ -8,3 +16,72 @@ def index():
 @app.route('/about')
 def about():
     return render_template('about.html')
+
+@app.route('/metrics/db')
+def db_metrics():
+    """Return connection pool statistics and per-endpoint round-trip counts as JSON"""
+    return jsonify(pool=get_pool_stats(), endpoints=get_db_usage())
+
+@app.route('/metrics/http')
+def http_metrics():
+    """Return per-upstream request counts, errors and latency histograms as JSON"""
+    return jsonify(get_http_stats())
+
+@app.route('/metrics/pages')
+def page_cache_metrics():
+    """Return DataTables page cache hits, misses, invalidations and hit ratio as JSON"""
+    return jsonify(get_page_cache_stats())
+
+@app.route('/export/<table>')
+def export_table(table):
+    """Stream a table as CSV or JSON Lines (?format=csv|jsonl), one row at a time"""
+    if table not in TRANSFER_TABLES:
+        return jsonify(error=f"Unknown table: {table}"), 404
+    fmt = detect_format(None, request.args.get('format', 'csv'))
+    if fmt is None:
+        return jsonify(error="format must be csv or jsonl"), 400
+
+    headers = {'Content-Disposition': f'attachment; filename={table}.{fmt}'}
+    if request.method == 'HEAD':
+        # No body is sent for HEAD, so don't borrow a connection for it
+        return Response(mimetype=EXPORT_MIMETYPES[fmt], headers=headers)
+
+    # The export holds its own pooled connection for as long as the download runs
+    connection = acquire_connection()
+    if connection is None:
+        return jsonify(error="Database connection failed"), 503
+
+    response = Response(
+        stream_with_context(export_rows(connection, table, fmt)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers=headers
+    )
+    # Released when the server closes the response, whether or not the body was read
+    response.call_on_close(lambda: release_connection(connection))
+    return response
+
+@app.route('/import/<table>', methods=['POST'])
+def import_table(table):
+    """Import an uploaded CSV or JSON Lines file into a table in batches; returns a JSON report"""
+    if table not in TRANSFER_TABLES:
+        return jsonify(error=f"Unknown table: {table}"), 404
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify(error="No file uploaded"), 400
+    fmt = detect_format(upload.filename, request.form.get('format'))
+    if fmt is None:
+        return jsonify(error="File must be .csv or .jsonl"), 400
+
+    connection = get_db()
+    if connection is None:
+        return jsonify(error="Database connection failed"), 503
+
+    # Decode the upload as it is read instead of loading it into memory
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    report = import_records(connection, table, read_records(stream, fmt))
+    report['elapsed'] = round(report['elapsed'], 3)
+    report['rate'] = round(report['rate'], 1)
+    if report['error']:
+        # Batches committed before the failure stay imported; report them with the error
+        return jsonify(table=table, format=fmt, **report), 500
+    return jsonify(table=table, format=fmt, **report)
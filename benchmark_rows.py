@@ -0,0 +1,58 @@
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.db_connect import load_schema, row_type
+from app.functions import _datatables_value
+
+# Compare the two ways a DataTables /X/data page can be built from the same
+# rows: DictCursor dicts sent as JSON objects, and the compact namedtuple rows
+# from row_type() sent as JSON arrays (what datatables_page() does).
+# Reports allocation (tracemalloc peak), build time and JSON encode time.
+# Rows are synthesized from the movies schema, so no database is needed.
+# Usage: python benchmark_rows.py [rows]
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+columns = load_schema()['movies']
+
+raw_rows = [
+    (movie_id, f"Movie {movie_id}", f"Director {movie_id % 500}", 1950 + movie_id % 75,
+     "A plot.", None, "Actor A, Actor B", "Drama", datetime(2024, 1, 1), datetime(2024, 1, 2))
+    for movie_id in range(count)
+]
+
+
+
+def build_dicts():
+    # DictCursor builds a dict per row, then each value is made JSON friendly
+    rows = [dict(zip(columns, row)) for row in raw_rows]
+    return [{column: _datatables_value(value) for column, value in row.items()} for row in rows]
+
+
+def build_compact():
+    # row_type() namedtuples, sent as arrays in column order
+    make = row_type('movies', columns)._make
+    rows = [make(row) for row in raw_rows]
+    return [list(map(_datatables_value, row)) for row in rows]
+
+
+def measure(name, build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = build()
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    body = json.dumps({'data': rows})
+    encode_seconds = time.perf_counter() - started
+
+    print(f"{name:<12} build {build_seconds * 1000:8.1f} ms   peak {peak / 1048576:8.1f} MiB   "
+          f"json {encode_seconds * 1000:8.1f} ms   {len(body) / 1048576:6.1f} MiB")
+
+
+print(f"Benchmarking {count} movies rows ({len(columns)} columns)...\n")
+measure('dict rows', build_dicts)
+measure('arrays', build_compact)
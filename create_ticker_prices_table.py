@@ -0,0 +1,44 @@
+import pymysql
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connect to database
+connection = pymysql.connect(
+    host=os.getenv('DB_HOST'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database=os.getenv('DB_NAME'),
+    cursorclass=pymysql.cursors.DictCursor
+)
+
+print("Connected to database successfully!")
+
+# SQL to create the price history table.
+# The (symbol, ts) primary key is InnoDB's clustered index, so each symbol's
+# history is stored together in time order and range scans stay cheap.
+ticker_prices_table_sql = """
+CREATE TABLE IF NOT EXISTS ticker_prices (
+    symbol VARCHAR(20) NOT NULL,
+    ts DATETIME NOT NULL,
+    price DECIMAL(12, 4) NOT NULL,
+    PRIMARY KEY (symbol, ts)
+)
+"""
+
+try:
+    with connection.cursor() as cursor:
+        print("\nCreating ticker_prices table...")
+        cursor.execute(ticker_prices_table_sql)
+        print("[SUCCESS] Ticker prices table created!")
+
+    connection.commit()
+    print("\n[SUCCESS] All schema updates completed successfully!")
+
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+    connection.rollback()
+finally:
+    connection.close()
+    print("\nDatabase connection closed.")
@@ -0,0 +1,48 @@
+import pymysql
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connect to database
+connection = pymysql.connect(
+    host=os.getenv('DB_HOST'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database=os.getenv('DB_NAME'),
+    cursorclass=pymysql.cursors.DictCursor
+)
+
+print("Connected to database successfully!")
+
+# SQL to create the geocode/NWS grid cache used by fetch_live_weather.
+# location_key is the normalized "city|state" string.
+weather_locations_table_sql = """
+CREATE TABLE IF NOT EXISTS weather_locations (
+    location_key VARCHAR(210) PRIMARY KEY,
+    latitude DECIMAL(8, 4) NOT NULL,
+    longitude DECIMAL(8, 4) NOT NULL,
+    grid_id VARCHAR(10),
+    grid_x INT,
+    grid_y INT,
+    forecast_url VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+try:
+    with connection.cursor() as cursor:
+        print("\nCreating weather_locations table...")
+        cursor.execute(weather_locations_table_sql)
+        print("[SUCCESS] Weather locations table created!")
+
+    connection.commit()
+    print("\n[SUCCESS] All schema updates completed successfully!")
+
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+    connection.rollback()
+finally:
+    connection.close()
+    print("\nDatabase connection closed.")
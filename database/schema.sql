@@ -28,6 +28,15 @@ CREATE TABLE tickers (
 -- Add index for ticker symbol lookups
 CREATE INDEX idx_tickers_symbol ON tickers (symbol);
 
+-- Create ticker price history table (appended by the price worker)
+-- The (symbol, ts) primary key clusters each symbol's history in time order
+CREATE TABLE ticker_prices (
+    symbol VARCHAR(20) NOT NULL,
+    ts DATETIME NOT NULL,
+    price DECIMAL(12, 4) NOT NULL,
+    PRIMARY KEY (symbol, ts)
+);
+
 -- Create weather table
 CREATE TABLE weather (
     weather_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -41,6 +50,19 @@ CREATE TABLE weather (
 -- Add index for city lookups
 CREATE INDEX idx_weather_city ON weather (city);
 
+-- Create weather location cache (geocode + NWS grid per normalized "city|state")
+CREATE TABLE weather_locations (
+    location_key VARCHAR(210) PRIMARY KEY,
+    latitude DECIMAL(8, 4) NOT NULL,
+    longitude DECIMAL(8, 4) NOT NULL,
+    grid_id VARCHAR(10),
+    grid_x INT,
+    grid_y INT,
+    forecast_url VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
 -- Create movies table
 CREATE TABLE movies (
     movie_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -57,4 +79,7 @@ CREATE TABLE movies (
 
 -- Add index for movie title lookups
 CREATE INDEX idx_movies_title ON movies (title);
-CREATE INDEX idx_movies_year ON movies (year);
\ No newline at end of file
+CREATE INDEX idx_movies_year ON movies (year);
+
+-- Full-text search over movies (/movies/search); see add_movies_fulltext_index.py
+CREATE FULLTEXT INDEX ft_movies_search ON movies (title, plot, actors, director);
@@ -0,0 +1,49 @@
+import sys
+
+from app.db_connect import acquire_connection, release_connection
+from app.blueprints.movies import enrich_all_movies
+
+# Fetch OMDB data for every movie added by title only (director and year still
+# NULL). Safe to stop and re-run: each saved batch is committed, so the next
+# run picks up the movies that are still missing data.
+# --cache-only fills movies from the local OMDB response cache without calling
+# OMDB (no quota used), e.g. when re-importing a list of known titles.
+# Usage: python enrich_movies.py [--cache-only] [limit]
+args = sys.argv[1:]
+cache_only = '--cache-only' in args
+args = [arg for arg in args if arg != '--cache-only']
+limit = int(args[0]) if args else None
+
+connection = acquire_connection()
+
+if connection is None:
+    print("[ERROR] Database connection failed")
+    sys.exit(1)
+
+print("Connected to database successfully!")
+
+
+def show_progress(report):
+    print(f"[INFO] {report['updated']} enriched, {len(report['failed'])} not found "
+          f"({report['rate']:.1f} movies/sec)")
+
+
+try:
+    print("\nFetching OMDB data for movies missing details" + (" (cache only)..." if cache_only else "..."))
+    report = enrich_all_movies(connection, limit=limit, progress=show_progress, cache_only=cache_only)
+
+    for title in report['failed']:
+        print(f"[ERROR] {title}: no OMDB data")
+    if report['skipped']:
+        print(f"[ERROR] OMDB daily quota reached; {report['skipped']} movie(s) left for the next run")
+
+    print(f"\n[SUCCESS] Enriched {report['updated']} movie(s) in {report['elapsed']:.2f}s "
+          f"({report['rate']:.1f} movies/sec)")
+
+except KeyboardInterrupt:
+    print("\n[INFO] Interrupted; saved batches are kept, re-run to continue.")
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+finally:
+    release_connection(connection)
+    print("\nDatabase connection closed.")
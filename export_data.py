@@ -0,0 +1,39 @@
+import sys
+
+from app.db_connect import acquire_connection, release_connection
+from app.bulk_io import TRANSFER_TABLES, detect_format, export_rows
+
+# Write movies, tickers or weather to a CSV or JSON Lines file. Rows are
+# streamed from an unbuffered server-side cursor straight to the file.
+# The format follows the file extension unless given explicitly.
+# Usage: python export_data.py <movies|tickers|weather> <file> [csv|jsonl]
+if len(sys.argv) not in (3, 4) or sys.argv[1] not in TRANSFER_TABLES:
+    print(f"Usage: python export_data.py <{'|'.join(TRANSFER_TABLES)}> <file> [csv|jsonl]")
+    sys.exit(1)
+
+table, path = sys.argv[1], sys.argv[2]
+fmt = detect_format(path, sys.argv[3] if len(sys.argv) == 4 else None)
+if fmt is None:
+    print("[ERROR] Format must be csv or jsonl")
+    sys.exit(1)
+
+connection = acquire_connection()
+
+if connection is None:
+    print("[ERROR] Database connection failed")
+    sys.exit(1)
+
+print("Connected to database successfully!")
+
+try:
+    print(f"\nExporting {table} to {path}...")
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        for chunk in export_rows(connection, table, fmt):
+            output.write(chunk)
+    print(f"\n[SUCCESS] Exported {table} to {path}")
+
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+finally:
+    release_connection(connection)
+    print("\nDatabase connection closed.")
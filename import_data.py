@@ -0,0 +1,57 @@
+import io
+import sys
+
+from app.db_connect import acquire_connection, release_connection
+from app.bulk_io import TRANSFER_TABLES, detect_format, read_records, import_records
+
+# Load a CSV (with a header row) or JSON Lines file into movies, tickers or
+# weather. The file is read one row at a time and inserted in batches, each
+# committed on its own, so files of any size import with flat memory.
+# Usage: python import_data.py <movies|tickers|weather> <file.csv|file.jsonl>
+if len(sys.argv) != 3 or sys.argv[1] not in TRANSFER_TABLES:
+    print(f"Usage: python import_data.py <{'|'.join(TRANSFER_TABLES)}> <file.csv|file.jsonl>")
+    sys.exit(1)
+
+table, path = sys.argv[1], sys.argv[2]
+fmt = detect_format(path)
+if fmt is None:
+    print("[ERROR] File must be .csv or .jsonl")
+    sys.exit(1)
+
+connection = acquire_connection()
+
+if connection is None:
+    print("[ERROR] Database connection failed")
+    sys.exit(1)
+
+print("Connected to database successfully!")
+
+
+def show_progress(report):
+    print(f"[INFO] {report['imported']} rows imported ({report['rate']:.0f} rows/sec)")
+
+
+try:
+    print(f"\nImporting {path} into {table}...")
+    with io.open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_records(connection, table, read_records(stream, fmt), progress=show_progress)
+
+    for error in report['errors']:
+        print(f"[ERROR] {error}")
+    if report['rejected'] > len(report['errors']):
+        print(f"[ERROR] ... and {report['rejected'] - len(report['errors'])} more rejected row(s)")
+
+    if report['error']:
+        print(f"\n[ERROR] {report['error']}")
+        print(f"[INFO] {report['imported']} row(s) were committed before the import stopped.")
+    else:
+        print(f"\n[SUCCESS] Imported {report['imported']} row(s), rejected {report['rejected']}, "
+              f"in {report['elapsed']:.2f}s ({report['rate']:.0f} rows/sec)")
+
+except KeyboardInterrupt:
+    print("\n[INFO] Interrupted; committed batches are kept.")
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+finally:
+    release_connection(connection)
+    print("\nDatabase connection closed.")
@@ -0,0 +1,55 @@
+import os
+import signal
+import time
+
+from app.db_connect import acquire_connection, release_connection
+from app.blueprints.tickers import refresh_all_prices
+
+# Background price ingestion: polls quotes for every ticker on an interval,
+# appends them to ticker_prices and keeps tickers.price current, so the web
+# process never has to wait on Yahoo. Run with: python price_worker.py
+POLL_INTERVAL = float(os.getenv('PRICE_POLL_INTERVAL', '60'))
+
+running = True
+
+
+def stop(signum, frame):
+    """Finish the current cycle and exit (Heroku sends SIGTERM on restart)."""
+    global running
+    print(f"\n[INFO] Received signal {signum}, stopping after this cycle...")
+    running = False
+
+
+def run_cycle():
+    """Fetch, store and report one round of prices."""
+    connection = acquire_connection()
+    if connection is None:
+        print("[ERROR] Database connection failed, skipping this cycle")
+        return
+
+    try:
+        report = refresh_all_prices(connection, record_history=True)
+        print(f"[SUCCESS] Stored {len(report['updated'])} price(s) in {report['elapsed']:.2f}s")
+        if report['failed']:
+            print(f"[ERROR] No price data for: {', '.join(report['failed'])}")
+    except Exception as e:
+        print(f"[ERROR] Price cycle failed: {e}")
+    finally:
+        release_connection(connection)
+
+
+signal.signal(signal.SIGTERM, stop)
+signal.signal(signal.SIGINT, stop)
+
+print(f"Price worker started, polling every {POLL_INTERVAL:.0f}s")
+
+while running:
+    started = time.monotonic()
+    run_cycle()
+
+    # Sleep until the next cycle in short steps so a stop signal is handled quickly
+    next_run = started + POLL_INTERVAL
+    while running and time.monotonic() < next_run:
+        time.sleep(max(0.0, min(1.0, next_run - time.monotonic())))
+
+print("Price worker stopped.")
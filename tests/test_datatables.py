@@ -0,0 +1,197 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import app.functions as functions
+from app import app as flask_app
+from app.blueprints.movies import MOVIES_TABLE
+from app.blueprints.tickers import TICKERS_TABLE
+from app.blueprints.weather import WEATHER_TABLE
+from app.functions import cache_clear, datatables_page, invalidate_table_pages
+
+CREATED = datetime(2024, 1, 1, 12, 0)
+
+MOVIES = [
+    {'movie_id': 1, 'poster': None, 'title': 'Alien', 'director': 'Ridley Scott', 'year': 1979, 'genre': 'Horror'},
+    {'movie_id': 2, 'poster': None, 'title': 'Brazil', 'director': 'Terry Gilliam', 'year': None, 'genre': 'Comedy'},
+    {'movie_id': 3, 'poster': None, 'title': 'Casablanca', 'director': None, 'year': 1942, 'genre': 'Drama'},
+]
+TICKERS = [
+    {'ticker_id': 1, 'symbol': 'AAPL', 'name': 'Apple Inc.', 'price': Decimal('189.5000'),
+     'updated_at': CREATED, 'created_at': CREATED},
+]
+WEATHER = [
+    {'weather_id': 1, 'city': 'Atlanta', 'state': 'GA', 'temperature': Decimal('75.00'),
+     'updated_at': CREATED, 'created_at': CREATED},
+]
+
+
+class FakeCursor:
+    """Cursor over canned rows: answers COUNT(*) queries and returns SELECT rows as tuples."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        self.connection.queries.append((query, list(args or [])))
+        if 'COUNT(*)' in query:
+            self.result = [{'total': len(self.connection.rows)}]
+            return
+        columns = [column.strip() for column in re.search(r"SELECT (.*?) FROM", query).group(1).split(',')]
+        self.description = [(column,) for column in columns]
+        limit, offset = args[-2], args[-1]
+        self.result = [tuple(row[column] for column in columns)
+                       for row in self.connection.rows[offset:offset + limit]]
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return list(self.result)
+
+
+class FakeConnection:
+    """Stands in for a pooled PyMySQL connection; records every query it is sent."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self)
+
+    def page_query(self):
+        """Return (sql, params) of the last page SELECT."""
+        return [query for query in self.queries if 'COUNT(*)' not in query[0]][-1]
+
+
+@pytest.fixture(autouse=True)
+def page_cache(tmp_path):
+    """Give every test its own shared page cache file and empty in-process caches."""
+    with patch.object(functions, 'PAGE_CACHE_PATH', str(tmp_path / 'page_cache.sqlite3')):
+        cache_clear(functions._page_cache)
+        cache_clear(functions._page_bookmarks)
+        yield
+
+
+@pytest.fixture
+def client():
+    flask_app.testing = True
+    with flask_app.test_client() as client:
+        yield client
+
+
+def page_args(spec, sort, direction='asc', start=0, length=2):
+    return MultiDict({
+        'draw': '1',
+        'start': str(start),
+        'length': str(length),
+        'search[value]': '',
+        'order[0][column]': str(spec['columns'].index(sort)),
+        'order[0][dir]': direction,
+    })
+
+
+@pytest.mark.parametrize('path, blueprint, rows', [
+    ('/movies/data', 'app.blueprints.movies', MOVIES),
+    ('/tickers/data', 'app.blueprints.tickers', TICKERS),
+    ('/weather/data', 'app.blueprints.weather', WEATHER),
+])
+def test_data_route_200(client, path, blueprint, rows):
+    with patch(f'{blueprint}.get_db', return_value=FakeConnection(rows)):
+        resp = client.get(path, query_string={'draw': 3, 'start': 0, 'length': 25})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body['draw'] == 3
+    assert body['recordsTotal'] == len(rows)
+    assert len(body['data']) == len(rows)
+    assert body['data'][0][0] == 1    # rows are arrays, key first
+
+
+def test_data_route_503_without_database(client):
+    with patch('app.blueprints.movies.get_db', return_value=None):
+        resp = client.get('/movies/data')
+    assert resp.status_code == 503
+
+
+def test_keyset_ascending():
+    connection = FakeConnection(MOVIES)
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'title'))
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'title', start=2))
+
+    sql, params = connection.page_query()
+    assert "WHERE (title > %s OR (title = %s AND movie_id > %s))" in sql
+    assert "ORDER BY title ASC, movie_id ASC" in sql
+    assert params == ['Brazil', 'Brazil', 2, 2, 0]
+
+
+def test_keyset_descending():
+    connection = FakeConnection(MOVIES)
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'title', 'desc'))
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'title', 'desc', start=2))
+
+    sql, params = connection.page_query()
+    assert "WHERE (title < %s OR (title = %s AND movie_id < %s))" in sql
+    assert "IS NULL" not in sql
+    assert "ORDER BY title DESC, movie_id DESC" in sql
+    assert params[-2:] == [2, 0]
+
+
+def test_keyset_descending_nullable_column_keeps_nulls():
+    # MySQL sorts NULLs last in DESC order, so the next page must still include them
+    rows = [MOVIES[0], MOVIES[2], MOVIES[1]]
+    connection = FakeConnection(rows)
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'year', 'desc'))
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'year', 'desc', start=2))
+
+    sql, params = connection.page_query()
+    assert "WHERE ((year < %s OR (year = %s AND movie_id < %s)) OR year IS NULL)" in sql
+    assert params == [1942, 1942, 3, 2, 0]
+
+
+def test_null_bookmark_falls_back_to_offset():
+    # MySQL sorts NULLs first in ASC order; a NULL last value cannot anchor a keyset
+    rows = [MOVIES[1], MOVIES[0], MOVIES[2]]
+    connection = FakeConnection(rows)
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'year', length=1))
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'year', start=1, length=1))
+
+    sql, params = connection.page_query()
+    assert "WHERE" not in sql
+    assert params == [1, 1]
+
+
+def test_bookmark_not_reused_after_invalidation():
+    connection = FakeConnection(MOVIES)
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'title'))
+    invalidate_table_pages('movies')
+    datatables_page(connection, MOVIES_TABLE, page_args(MOVIES_TABLE, 'title', start=2))
+
+    sql, params = connection.page_query()
+    assert "WHERE" not in sql
+    assert params == [2, 2]
+
+
+def test_cached_page_served_until_invalidation(client):
+    connection = FakeConnection(TICKERS)
+    with patch('app.blueprints.tickers.get_db', return_value=connection):
+        client.get('/tickers/data', query_string={'draw': 1})
+        client.get('/tickers/data', query_string={'draw': 2})
+        assert len(connection.queries) == 2    # COUNT + page, built once
+
+        invalidate_table_pages('tickers')
+        resp = client.get('/tickers/data', query_string={'draw': 3})
+    assert resp.get_json()['draw'] == 3
+    assert len(connection.queries) == 4
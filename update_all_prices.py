@@ -0,0 +1,31 @@
+import sys
+
+from app.db_connect import acquire_connection, release_connection
+from app.blueprints.tickers import refresh_all_prices
+
+# Refresh every ticker price in one batched download and one UPDATE
+connection = acquire_connection()
+
+if connection is None:
+    print("[ERROR] Database connection failed")
+    sys.exit(1)
+
+print("Connected to database successfully!")
+
+try:
+    print("\nFetching live prices for all tickers...")
+    report = refresh_all_prices(connection)
+
+    for symbol, price in sorted(report['updated'].items()):
+        print(f"[SUCCESS] {symbol}: ${price:.2f}")
+    for symbol in report['failed']:
+        print(f"[ERROR] {symbol}: no price data")
+
+    print(f"\n[SUCCESS] Updated {len(report['updated'])} of "
+          f"{len(report['updated']) + len(report['failed'])} tickers in {report['elapsed']:.2f}s")
+
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+finally:
+    release_connection(connection)
+    print("\nDatabase connection closed.")
@@ -0,0 +1,29 @@
+import sys
+
+from app.db_connect import acquire_connection, release_connection
+from app.blueprints.weather import refresh_all_weather
+
+# Refresh every city's temperature concurrently and save them in one UPDATE
+connection = acquire_connection()
+
+if connection is None:
+    print("[ERROR] Database connection failed")
+    sys.exit(1)
+
+print("Connected to database successfully!")
+
+try:
+    print("\nFetching live weather for all cities...")
+    report = refresh_all_weather(connection)
+
+    for city in report['failed']:
+        print(f"[ERROR] {city}: no weather data")
+
+    print(f"\n[SUCCESS] Updated {len(report['updated'])} of "
+          f"{len(report['updated']) + len(report['failed'])} weather records in {report['elapsed']:.2f}s")
+
+except Exception as e:
+    print(f"\n[ERROR] {e}")
+finally:
+    release_connection(connection)
+    print("\nDatabase connection closed.")